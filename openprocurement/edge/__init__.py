@@ -11,7 +11,14 @@ from logging import getLogger
 from openprocurement.api.auth import AuthenticationPolicy, authenticated_role, check_accreditation
 from openprocurement.api.design import sync_design
 from openprocurement.api.utils import forbidden, add_logging_context, extract_tender, request_params, set_renderer, beforerender, route_prefix, set_logging_context
-from openprocurement.edge.utils import extract_tender, extract_auction, extract_contract, extract_plan
+from openprocurement.edge.cache import DocumentCache, LRUCache, MemcachedBackend, ResponseCache, SingleFlight
+from openprocurement.edge.changes import ChangesFollower, IndexLag
+from openprocurement.edge.design import ITEMS_VIEW, add_design, sync_edge_views
+from openprocurement.edge.feedindex import FeedIndex
+from openprocurement.edge.listing import LISTINGS, get_projections, get_stale_bounds
+from openprocurement.edge.search import SearchIndex
+from openprocurement.edge.store import CouchStore, SQLiteStore
+from openprocurement.edge.utils import extract_tender, extract_auction, extract_contract, extract_plan, OffsetCodec
 try:
     import openprocurement.auctions.core as auctions_core
     from openprocurement.auctions.core.design import add_design as add_auction_design
@@ -32,7 +39,7 @@ from pyramid.authorization import ACLAuthorizationPolicy as AuthorizationPolicy
 from pyramid.config import Configurator
 from pyramid.events import NewRequest, BeforeRender, ContextFound
 from pyramid.renderers import JSON, JSONP
-from pyramid.settings import asbool
+from pyramid.settings import asbool, aslist
 
 LOGGER = getLogger("{}.init".format(__name__))
 SECURITY = {u'admins': {u'names': [], u'roles': ['_admin']}, u'members': {u'names': [], u'roles': ['_admin']}}
@@ -92,6 +99,7 @@ def main(global_config, **settings):
     config.scan("openprocurement.edge.views.spore")
     config.scan("openprocurement.edge.views.health")
     config.scan("openprocurement.edge.views.tenders")
+    add_design()
 
     if auctions_core:
         config.add_request_method(extract_auction, 'auction', reify=True)
@@ -108,6 +116,46 @@ def main(global_config, **settings):
         config.scan("openprocurement.edge.views.plans")
         add_plan_design()
 
+    config.registry.projections = get_projections(settings)
+    edge_views = [
+        view
+        for projections in config.registry.projections.values()
+        for _, feeds in projections
+        for views in feeds.values()
+        for view in views.values()
+    ]
+    config.registry.compact_views = asbool(settings.get('compact_views', True))
+    if config.registry.compact_views:
+        edge_views.extend([
+            view
+            for listing in LISTINGS.values()
+            for views in listing.compact.values()
+            for view in views.values()
+        ])
+    config.registry.list_filters = asbool(settings.get('list_filters', True))
+    if config.registry.list_filters:
+        edge_views.extend([
+            view
+            for listing in LISTINGS.values()
+            for views in listing.filtered.values()
+            for view in views.values()
+        ])
+
+    config.registry.stats_views = asbool(settings.get('stats_views', True))
+    if config.registry.stats_views:
+        edge_views.extend([
+            view
+            for listing in LISTINGS.values()
+            for views in listing.stats.values()
+            for view in views.values()
+        ])
+
+    # the items view holds a copy of every item, about the size of the database,
+    # so it is only built when asked for
+    config.registry.item_views = asbool(settings.get('item_views', False))
+    if config.registry.item_views:
+        edge_views.append(ITEMS_VIEW)
+
     # CouchDB connection
     db_name = os.environ.get('DB_NAME', settings['couchdb.db_name'])
     server = Server(settings.get('couchdb.url'), session=Session(retry_delays=range(10)))
@@ -163,6 +211,7 @@ def main(global_config, **settings):
             db.save(auth_doc)
         # sync couchdb views
         sync_design(db)
+        sync_edge_views(db, edge_views)
         db = server[db_name]
     else:
         if db_name not in server:
@@ -170,9 +219,54 @@ def main(global_config, **settings):
         db = server[db_name]
         # sync couchdb views
         sync_design(db)
+        sync_edge_views(db, edge_views)
     config.registry.db = db
+    config.registry.offset_codec = OffsetCodec(server.uuid, db.name)
 
     config.registry.server_id = settings.get('id', '')
     config.registry.health_threshold = float(settings.get('health_threshold', 99))
     config.registry.update_after = asbool(settings.get('update_after', True))
+    config.registry.document_flight = SingleFlight()
+    config.registry.list_flight = SingleFlight()
+    config.registry.public_id_cache = LRUCache(int(settings.get('public_id_cache_size', 10000)))
+    config.registry.stats_cache = LRUCache(int(settings.get('stats_cache_size', 100)))
+    config.registry.item_index_cache = LRUCache(int(settings.get('item_index_cache_size', 1000)))
+    config.registry.munch_cache = LRUCache(int(settings.get('munch_cache_size', 100)))
+    config.registry.stream_listing = asbool(settings.get('stream_listing', True))
+    config.registry.stream_batch_size = int(settings.get('stream_batch_size', 200))
+    config.registry.bulk_get_limit = int(settings.get('bulk_get_limit', 100))
+    config.registry.longpoll_timeout = float(settings.get('longpoll_timeout', 30))
+    config.registry.changes_follower = ChangesFollower(db, config.registry.longpoll_timeout)
+    config.registry.store = CouchStore(db)
+    if settings.get('local_store'):
+        config.registry.store = SQLiteStore(db, settings['local_store'], config.registry.changes_follower,
+                                            float(settings.get('local_store_max_lag', 1)),
+                                            int(settings.get('local_store_batch_size', 200)), config.registry.longpoll_timeout)
+        config.registry.store.start()
+    config.registry.doc_cache = None
+    if settings.get('doc_cache') == 'memory':
+        config.registry.doc_cache = DocumentCache(LRUCache(int(settings.get('doc_cache_size', 1000))),
+                                                  config.registry.changes_follower, db.name)
+    elif settings.get('doc_cache') == 'memcached':
+        backend = MemcachedBackend(aslist(settings.get('doc_cache_servers', '127.0.0.1:11211')), int(settings.get('doc_cache_ttl', 60)))
+        config.registry.doc_cache = DocumentCache(backend, config.registry.changes_follower,
+                                                  settings.get('doc_cache_prefix', db.name))
+    config.registry.feed_index = None
+    if settings.get('feed_index'):
+        config.registry.feed_index = FeedIndex(db, settings['feed_index'], [listing.doc_type for listing in LISTINGS.values()],
+                                               config.registry.changes_follower, float(settings.get('feed_index_max_lag', 1)),
+                                               int(settings.get('feed_index_batch_size', 200)), config.registry.longpoll_timeout)
+        config.registry.feed_index.start()
+    config.registry.search_index = None
+    if settings.get('search_index'):
+        config.registry.search_index = SearchIndex(db, settings['search_index'], int(settings.get('search_index_batch_size', 200)),
+                                                   config.registry.longpoll_timeout)
+        config.registry.search_index.start()
+    config.registry.stale_bounds = get_stale_bounds(settings)
+    config.registry.index_lag = IndexLag(config.registry.changes_follower, float(settings.get('index_lag_interval', 1)))
+    list_cache_ttl = float(settings.get('list_cache_ttl', 1))
+    config.registry.list_cache = None
+    if list_cache_ttl:
+        config.registry.list_cache = ResponseCache(config.registry.changes_follower, list_cache_ttl,
+                                                   int(settings.get('list_cache_size', 1000)))
     return config.make_wsgi_app()
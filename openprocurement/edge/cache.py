@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from gevent.event import AsyncResult
+from json import dumps, loads
+from time import time
+try:
+    import memcache
+except ImportError:
+    memcache = None
+
+
+class LRUCache(object):
+    """Bounded mapping that evicts the least recently used entries."""
+
+    def __init__(self, size=1000):
+        self.size = size
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            return default
+        self._data[key] = value
+        return value
+
+    def set(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class SingleFlight(object):
+    """Share one call between concurrent callers asking for the same key."""
+
+    def __init__(self):
+        self.calls = {}
+
+    def __call__(self, key, func):
+        call = self.calls.get(key)
+        if call is not None:
+            return call.get()
+        call = self.calls[key] = AsyncResult()
+        try:
+            value = func()
+        # killed or timed out leaders too, or their waiters would wait forever
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set(value)
+            return value
+        finally:
+            del self.calls[key]
+
+
+class ResponseCache(object):
+    """Short-lived response cache, dropped as soon as the database changes.
+
+    Entries remember the update seq seen by the changes follower and
+    expire after ``ttl`` seconds in case the follower is behind;
+    concurrent misses of a key share one computation.
+    """
+
+    def __init__(self, follower, ttl=1, size=1000):
+        self.follower = follower
+        self.ttl = ttl
+        self.entries = LRUCache(size)
+        self.flight = SingleFlight()
+
+    def get(self, key, func):
+        seq = self.follower.start()
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == seq and entry[1] > time():
+            return entry[2]
+        value = self.flight((seq, key), func)
+        self.entries.set(key, (seq, time() + self.ttl, value))
+        return value
+
+
+class MemcachedBackend(object):
+    """``DocumentCache`` backend shared by the processes using the same memcached servers.
+
+    Entries expire after ``ttl`` seconds (0 for never).
+    """
+
+    def __init__(self, servers, ttl=0):
+        if memcache is None:
+            raise ImportError('python-memcached is required for a memcached document cache')
+        self.client = memcache.Client(servers)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        value = self.client.get(key)
+        return default if value is None else value
+
+    def set(self, key, value):
+        self.client.set(key, value, time=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+class DocumentCache(object):
+    """Documents as JSON keyed by id and revision, in a backend that may be shared.
+
+    The current revision of a document is kept apart, under its id, and
+    dropped by the changes follower when the document changes; documents
+    of a revision never change. Current revisions are keyed by a
+    generation stored in the backend, which a restart of any follower
+    replaces to drop them all, in every process sharing the backend.
+    ``LRUCache`` is the in-process backend.
+    """
+
+    def __init__(self, backend, follower, prefix=''):
+        self.backend = backend
+        self.follower = follower
+        self.prefix = prefix
+        follower.listeners.append(self.invalidate)
+
+    def generation(self):
+        generation = self.backend.get('{}:gen'.format(self.prefix))
+        return self.new_generation() if generation is None else generation
+
+    def new_generation(self):
+        generation = '{:x}'.format(int(time() * 1000000))
+        self.backend.set('{}:gen'.format(self.prefix), generation)
+        return generation
+
+    def rev_key(self, generation, doc_id):
+        return '{}:rev:{}:{}'.format(self.prefix, generation, doc_id)
+
+    def doc_key(self, doc_id, rev):
+        return '{}:doc:{}:{}'.format(self.prefix, doc_id, rev)
+
+    def get(self, doc_id, fetch):
+        """Document ``doc_id``, read with ``fetch`` unless its current revision is cached."""
+        # a follower restarted after an error drops every current revision
+        seq = self.follower.start()
+        generation = self.generation()
+        rev = self.backend.get(self.rev_key(generation, doc_id))
+        if rev is not None:
+            body = self.backend.get(self.doc_key(doc_id, rev))
+            if body is not None:
+                return loads(body)
+        doc = fetch(doc_id)
+        if doc is None:
+            return None
+        self.backend.set(self.doc_key(doc_id, doc['_rev']), dumps(doc))
+        # a change seen meanwhile may be newer than the fetched revision
+        if self.follower.seq == seq:
+            self.backend.set(self.rev_key(generation, doc_id), doc['_rev'])
+        return doc
+
+    def invalidate(self, changes):
+        """Drop current revisions of the changed documents, all of them if ``changes`` is None."""
+        if changes is None:
+            self.new_generation()
+            return
+        if changes:
+            generation = self.generation()
+        for change in changes:
+            self.backend.delete(self.rev_key(generation, change['id']))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import gevent
+from collections import deque
+from gevent.event import AsyncResult, Event
+from logging import getLogger
+from time import time
+
+LOGGER = getLogger(__name__)
+
+
+class ChangesFollower(object):
+    """Single CouchDB ``_changes`` longpoll loop shared by a worker.
+
+    Requests waiting for new documents block on ``wait`` instead of
+    polling their views; the loop is started by the first waiter, so
+    every worker process runs its own. ``listeners`` are called with the
+    changes read, once the seq has moved past them, or with None when
+    the loop (re)starts and changes before it are unknown.
+    """
+
+    def __init__(self, db, timeout=30, history=1000):
+        self.db = db
+        self.timeout = timeout
+        self.seq = None
+        self.event = Event()
+        self.greenlet = None
+        self.started = None
+        self.history = deque(maxlen=history)
+        self.listeners = []
+
+    def start(self):
+        """Follow the database if not yet following; return the last seen seq."""
+        if self.greenlet is None or self.greenlet.dead:
+            # the loop is claimed before the seq is read, which yields, so
+            # that requests coming meanwhile wait for it instead of starting
+            # loops of their own
+            self.started = AsyncResult()
+            self.greenlet = gevent.spawn(self.run)
+        self.started.get()
+        return self.seq
+
+    def run(self):
+        try:
+            seq = self.db.info()['update_seq']
+        except Exception as e:
+            self.started.set_exception(e)
+            return
+        self.seq = seq
+        self.history.clear()
+        self.history.append((self.seq, time()))
+        for listener in self.listeners:
+            listener(None)
+        self.started.set()
+        while True:
+            try:
+                result = self.db.changes(feed='longpoll', since=self.seq, timeout=int(self.timeout * 1000))
+            except Exception as e:
+                LOGGER.warning('Changes follower stopped: {}'.format(e), extra={'MESSAGE_ID': 'changes_follower_error'})
+                return
+            seq, self.seq = self.seq, result['last_seq']
+            if self.seq != seq:
+                self.history.append((self.seq, time()))
+            # the seq moves on first, so that what is read before it is not
+            # cached after listeners have dropped it
+            for listener in self.listeners:
+                listener(result['results'])
+            if self.seq != seq:
+                event, self.event = self.event, Event()
+                event.set()
+
+    def wait(self, seq, timeout):
+        """Wait up to ``timeout`` seconds for the database to move past ``seq``.
+
+        Returns whether it did.
+        """
+        event = self.event
+        if self.seq == seq:
+            event.wait(timeout)
+        return self.seq != seq
+
+    def behind_since(self, seq):
+        """Time the database was first seen past ``seq``, None if it is not."""
+        for db_seq, seen in self.history:
+            if db_seq > seq:
+                return seen
+
+
+class IndexLag(object):
+    """Seconds by which view indexes of a design document lag behind the database.
+
+    Index seqs are read from the design document info at most once per
+    ``interval`` seconds; the follower history tells since when the
+    database has been past them.
+    """
+
+    def __init__(self, follower, interval=1):
+        self.follower = follower
+        self.interval = interval
+        self.seqs = {}
+
+    def __call__(self, db, design):
+        self.follower.start()
+        since = self.follower.behind_since(self.seq(db, design))
+        return time() - since if since is not None else 0
+
+    def seq(self, db, design):
+        """Update seq of the view indexes of ``design``, as last read."""
+        now = time()
+        checked = self.seqs.get(design)
+        if checked is None or checked[0] + self.interval < now:
+            checked = self.seqs[design] = (now, db.info(design)['view_index']['update_seq'])
+        return checked[1]
+
+    def refreshed(self, design, seq):
+        """Record a fresh read, which brings the index at least to ``seq``."""
+        self.seqs[design] = (time(), seq)
@@ -16,6 +16,7 @@ from urlparse import urljoin
 from couchdb import Database, Session
 from openprocurement_client.sync import get_tenders
 from openprocurement_client.client import TendersClient
+from openprocurement.edge.revisions import add_revision
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,9 @@ class EdgeDataBridge(object):
         self.api_host = self.config_get('tenders_api_server')
         self.api_version = self.config_get('tenders_api_version')
         self.retrievers_params = self.config_get('retrievers_params')
+        self.revisions_history = self.config_get('revisions_history')
+        if self.revisions_history is None:
+            self.revisions_history = 10
 
         self.client = TendersClient(host_url=self.api_host,
             api_version=self.api_version, key=''
@@ -70,6 +74,13 @@ class EdgeDataBridge(object):
             except Exception as e:
                 logger.info('Saving tender {} fail with error {}'.format(tender_id, e.message),
                     extra={'MESSAGE_ID': 'edge_bridge_fail_save_in_db'})
+                return
+            if tender_doc and self.revisions_history:
+                try:
+                    add_revision(self.db, tender_doc, tender, self.revisions_history)
+                except Exception as e:
+                    logger.info('Saving tender {} revision fail with error {}'.format(tender_id, e.message),
+                        extra={'MESSAGE_ID': 'edge_bridge_fail_save_revision'})
         else:
             logger.info('Tender {} not found'.format(tender_id))
 
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+from couchdb.design import ViewDefinition
+from json import dumps
+from openprocurement.api import design
+
+
+ITEM_COLLECTIONS = ['documents', 'bids', 'awards', 'lots', 'questions']
+MODE_VIEWS = {
+    u'': ('real_', " && !doc.mode"),
+    u'test': ('test_', " && doc.mode == 'test'"),
+    u'_all_': ('', ''),
+}
+FEED_VIEWS = {
+    u'dateModified': ('by_dateModified', 'doc.dateModified'),
+    u'changes': ('by_local_seq', 'doc._local_seq'),
+}
+LIST_VIEW = '''function(doc) {
+    if(doc.doc_type == '%(doc_type)s' && doc.status != 'draft'%(mode)s) {
+        var fields=%(fields)s, data={};
+        for (var i in fields) {
+            if (doc[fields[i]]) {
+                data[fields[i]] = doc[fields[i]]
+            }
+        }
+        emit(%(key)s, data);
+    }
+}'''
+COMPACT_VIEW = '''function(doc) {
+    if(doc.doc_type == '%(doc_type)s' && doc.status != 'draft'%(mode)s) {
+        emit(%(key)s, %(value)s);
+    }
+}'''
+FILTER_VIEW = '''function(doc) {
+    if(doc.doc_type == '%(doc_type)s' && doc.status != 'draft'%(mode)s) {
+        var values=%(values)s, filters=%(filters)s;
+        for (var i in filters) {
+            var key=[filters[i].join(',')];
+            for (var j = 0; j < filters[i].length && key; j++) {
+                var value = values[filters[i][j]];
+                key = value ? key.concat([value]) : null;
+            }
+            if (key) {
+                key.push(%(key)s);
+                emit(key, %(value)s);
+            }
+        }
+    }
+}'''
+FILTERS = [
+    ('status', 'doc.status'),
+    ('procurementMethodType', 'doc.procurementMethodType'),
+    ('procuringEntity', 'doc.procuringEntity && doc.procuringEntity.identifier && doc.procuringEntity.identifier.id'),
+]
+STATS_VIEW = '''function(doc) {
+    if(doc.doc_type == '%(doc_type)s' && doc.status != 'draft'%(mode)s) {
+        var values = {
+            status: doc.status || null,
+            procurementMethodType: doc.procurementMethodType || null,
+            month: (doc.date || doc.dateModified || '').slice(0, 7) || null
+        };
+        var amount = doc.value && doc.value.amount;
+        emit(%(key)s, typeof amount == 'number' ? amount : 0);
+    }
+}'''
+STATS_DIMENSIONS = ['status', 'procurementMethodType', 'month']
+COMPACT_VALUES = {
+    u'dateModified': 'null',
+    u'changes': 'doc.dateModified',
+}
+
+
+def add_design():
+    for i, j in globals().items():
+        if "_view" in i and isinstance(j, ViewDefinition):
+            setattr(design, i, j)
+
+
+def add_index_options(doc):
+    doc['options'] = {'local_seq': True}
+
+
+def sync_edge_views(db, views):
+    ViewDefinition.sync_many(db, views, callback=add_index_options)
+
+
+def make_list_views(doc_type, design_name, fields):
+    """Build views keyed like the standard list views of ``doc_type``.
+
+    Values carry ``fields`` (and ``dateModified`` for the changes feed).
+    Returns ``{feed: {mode: view}}`` in the shape of the views modules FEED.
+    """
+    views = {}
+    for feed, (view_name, key) in FEED_VIEWS.items():
+        feed_fields = sorted(set(fields + ['dateModified'] if feed == u'changes' else fields))
+        views[feed] = dict([
+            (mode, ViewDefinition(design_name, prefix + view_name, LIST_VIEW % {
+                'doc_type': doc_type,
+                'mode': condition,
+                'fields': dumps(feed_fields),
+                'key': key,
+            }))
+            for mode, (prefix, condition) in MODE_VIEWS.items()
+        ])
+    return views
+
+
+def make_compact_views(doc_type, design_name):
+    """Build key-only list views of ``doc_type`` for responses without opt_fields.
+
+    Values are ``null``, or ``dateModified`` for the changes feed.
+    Returns ``{feed: {mode: view}}`` like ``make_list_views``.
+    """
+    views = {}
+    for feed, (view_name, key) in FEED_VIEWS.items():
+        views[feed] = dict([
+            (mode, ViewDefinition(design_name, prefix + view_name, COMPACT_VIEW % {
+                'doc_type': doc_type,
+                'mode': condition,
+                'key': key,
+                'value': COMPACT_VALUES[feed],
+            }))
+            for mode, (prefix, condition) in MODE_VIEWS.items()
+        ])
+    return views
+
+
+def make_filter_views(doc_type, design_name):
+    """Build list views of ``doc_type`` keyed by filter values.
+
+    Every combination of ``FILTERS`` found in a document is emitted as
+    ``[names, value, ..., key]``, ``names`` being the comma separated
+    filter names and ``key`` the one of the standard view; values are
+    those of ``make_compact_views``. Returns ``{feed: {mode: view}}`` like
+    ``make_list_views``.
+    """
+    names = [name for name, _ in FILTERS]
+    filters = [[name for n, name in enumerate(names) if i & 1 << n] for i in range(1, 1 << len(names))]
+    values = '{%s}' % ', '.join(['%s: %s' % (name, value) for name, value in FILTERS])
+    views = {}
+    for feed, (view_name, key) in FEED_VIEWS.items():
+        views[feed] = dict([
+            (mode, ViewDefinition(design_name, prefix + view_name, FILTER_VIEW % {
+                'doc_type': doc_type,
+                'mode': condition,
+                'values': values,
+                'filters': dumps(filters),
+                'key': key,
+                'value': COMPACT_VALUES[feed],
+            }))
+            for mode, (prefix, condition) in MODE_VIEWS.items()
+        ])
+    return views
+
+
+def make_stats_views(doc_type, design_name):
+    """Build ``_stats`` reduce views of ``doc_type`` for every leading dimension.
+
+    Keys are the ``STATS_DIMENSIONS`` values (month of ``date``, or of
+    ``dateModified``), the given one first; values are ``value.amount``,
+    0 for documents without it. Returns ``{dimension: {mode: view}}``.
+    """
+    views = {}
+    for dimension in STATS_DIMENSIONS:
+        key = [dimension] + [i for i in STATS_DIMENSIONS if i != dimension]
+        views[dimension] = dict([
+            (mode, ViewDefinition(design_name, '{}by_{}'.format(prefix, dimension), STATS_VIEW % {
+                'doc_type': doc_type,
+                'mode': condition,
+                'key': '[{}]'.format(', '.join(['values.{}'.format(i) for i in key])),
+            }, '_stats'))
+            for mode, (prefix, condition) in MODE_VIEWS.items()
+        ])
+    return views
+
+
+# Item bodies are emitted whole, so the index is about as large as the
+# documents themselves; it is only installed with the item_views setting.
+ITEMS_VIEW = ViewDefinition('items', 'by_path', '''function(doc) {
+    if(doc.doc_type) {
+        var collections=%s;
+        for (var i in collections) {
+            var items = doc[collections[i]];
+            if (items && items.length) {
+                for (var j = 0; j < items.length; j++) {
+                    if (items[j] && items[j].id) {
+                        emit([doc.doc_type, doc._id, collections[i], items[j].id, j], items[j]);
+                    }
+                }
+            }
+        }
+    }
+}''' % ITEM_COLLECTIONS)
+
+
+public_ids_view = ViewDefinition('public_ids', 'by_public_id', '''function(doc) {
+    if(doc.doc_type) {
+        var public_id = doc[doc.doc_type.toLowerCase() + 'ID'];
+        if (public_id) {
+            emit([doc.doc_type, public_id], null);
+        }
+    }
+}''')
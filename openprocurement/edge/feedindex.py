@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+import fcntl
+import gevent
+import mmap
+import os
+import struct
+from couchdb.client import Row
+from logging import getLogger
+from time import time
+
+LOGGER = getLogger(__name__)
+MAGIC = 'EDGEFIX1'
+# magic, seq of the last change applied
+HEADER = struct.Struct('<8sQ')
+# local_seq, flags, dateModified, id
+RECORD = struct.Struct('<QB40s64s')
+SEQ = struct.Struct('<Q')
+DEAD = 1
+# share of the records of a file dead when it is compacted
+COMPACT_RATIO = 0.25
+MODE_FILES = {
+    u'': 'real',
+    u'test': 'test',
+    u'_all_': 'all',
+}
+
+
+class FeedFile(object):
+    """Append-only file of ``(local_seq, id)`` records of one document type and mode.
+
+    Records are in ``local_seq`` order; the record of a document is
+    flagged dead in place when the document changes again, and dead
+    records are dropped by rewriting the file. Readers map the file
+    read-only and remap it when it has grown or been rewritten.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self.stat = None
+        self.size = 0
+        self.count = 0
+        self.dead = 0
+
+    def open(self):
+        """Open the file for writing, creating it or dropping a partly written record."""
+        if os.path.exists(self.path + '.new'):
+            os.remove(self.path + '.new')
+        new = not os.path.exists(self.path)
+        self.file = open(self.path, 'w+b' if new else 'r+b')
+        if new:
+            self.file.write(HEADER.pack(MAGIC, 0))
+            self.file.flush()
+        size = os.fstat(self.file.fileno()).st_size
+        end = size - (size - HEADER.size) % RECORD.size
+        if end != size:
+            self.file.truncate(end)
+        self.count = (end - HEADER.size) // RECORD.size
+        self.dead = 0
+
+    def records(self):
+        """``(position, seq, dead, doc_id)`` of every record, as the writer reads them on start."""
+        self.file.seek(HEADER.size)
+        position = 0
+        while True:
+            data = self.file.read(RECORD.size)
+            if len(data) < RECORD.size:
+                return
+            seq, flags, _, doc_id = RECORD.unpack(data)
+            yield position, seq, flags & DEAD, doc_id.rstrip('\0')
+            position += 1
+
+    def append(self, seq, date_modified, doc_id):
+        self.file.seek(0, os.SEEK_END)
+        position = (self.file.tell() - HEADER.size) // RECORD.size
+        self.file.write(RECORD.pack(seq, 0, date_modified.encode('ascii'), doc_id.encode('ascii')))
+        self.count += 1
+        return position
+
+    def kill(self, position):
+        self.file.seek(HEADER.size + position * RECORD.size + SEQ.size)
+        self.file.write(chr(DEAD))
+        self.dead += 1
+
+    def checkpoint(self, seq):
+        self.file.flush()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, seq))
+        self.file.flush()
+
+    def compact(self, seq):
+        """Rewrite the file without its dead records, checkpointed at ``seq``.
+
+        The new file is renamed over the old one, which readers keep
+        mapped until they see it replaced. Returns the new positions of
+        the live records by their old ones.
+        """
+        self.file.flush()
+        self.file.seek(HEADER.size)
+        positions = {}
+        new = open(self.path + '.new', 'w+b')
+        new.write(HEADER.pack(MAGIC, seq))
+        for position in xrange(self.count):
+            data = self.file.read(RECORD.size)
+            if not ord(data[SEQ.size]) & DEAD:
+                positions[position] = len(positions)
+                new.write(data)
+        new.flush()
+        os.fsync(new.fileno())
+        os.rename(self.path + '.new', self.path)
+        self.file.close()
+        self.file = new
+        self.count = len(positions)
+        self.dead = 0
+        return positions
+
+    def reader(self):
+        """The file mapped for reading and its number of records, None if there is no file."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        if (stat.st_ino, stat.st_size) != self.stat:
+            with open(self.path, 'rb') as f:
+                # the file may have been replaced since
+                stat = os.fstat(f.fileno())
+                if stat.st_size < HEADER.size:
+                    return None
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.stat, self.size = (stat.st_ino, stat.st_size), stat.st_size
+        return self.map, (self.size - HEADER.size) // RECORD.size
+
+    def seq(self, data):
+        return HEADER.unpack_from(data)[1]
+
+    def search(self, data, count, seq, right):
+        """Position of the first record with a seq above (``right``) or from ``seq``."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            key = SEQ.unpack_from(data, HEADER.size + middle * RECORD.size)[0]
+            if key < seq or right and key == seq:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class FeedIndexView(object):
+    """Changes view rows read from a ``FeedFile``, in place of the compact ``list_view``."""
+
+    def __init__(self, feed_file, data, count, list_view):
+        self.feed_file = feed_file
+        self.data = data
+        self.count = count
+        self.design = list_view.design
+        self.name = list_view.name
+
+    def __call__(self, db, limit=None, startkey=None, descending=False, **options):
+        data = self.data
+        keyset = 'startkey_docid' in options
+        # the changes feed starts descending lists with 'now'
+        if not isinstance(startkey, (int, long)):
+            position = self.count - 1 if descending else 0
+        elif descending:
+            position = self.feed_file.search(data, self.count, startkey, not keyset) - 1
+        else:
+            position = self.feed_file.search(data, self.count, startkey, keyset)
+        step = -1 if descending else 1
+        n = 0
+        while 0 <= position < self.count and (limit is None or n < limit):
+            seq, flags, date_modified, doc_id = RECORD.unpack_from(data, HEADER.size + position * RECORD.size)
+            position += step
+            if flags & DEAD:
+                continue
+            n += 1
+            yield Row(id=doc_id.rstrip('\0'), key=seq, value=date_modified.rstrip('\0'))
+
+
+class FeedIndex(object):
+    """Memory-mapped ``local_seq`` feed files shared by the worker processes.
+
+    One worker, holding the lock file, appends the changes of the
+    database to a file per document type and mode; every worker reads
+    pages of the compact changes feed from them by binary search. A file
+    lagging more than ``max_lag`` seconds behind the database is not
+    read, the CouchDB views are. Files are compacted once a
+    ``COMPACT_RATIO`` share of their records (and at least a ``batch``
+    of them) are dead, so pages skip few of them.
+    """
+
+    def __init__(self, db, path, doc_types, follower, max_lag=1, batch=200, timeout=30):
+        self.db = db
+        self.path = path
+        self.follower = follower
+        self.max_lag = max_lag
+        self.batch = batch
+        self.timeout = timeout
+        self.greenlet = None
+        self.files = dict([
+            ((doc_type, mode), FeedFile(os.path.join(path, '{}_{}.seq'.format(doc_type.lower(), name))))
+            for doc_type in doc_types
+            for mode, name in MODE_FILES.items()
+        ])
+
+    def list_view(self, list_view, doc_type, mode):
+        """What to read the compact changes ``list_view`` from; called like the view itself."""
+        feed_file = self.files.get((doc_type, mode))
+        mapped = feed_file.reader() if feed_file else None
+        if mapped is None:
+            return list_view
+        data, count = mapped
+        self.follower.start()
+        since = self.follower.behind_since(feed_file.seq(data))
+        if since is not None and time() - since > self.max_lag:
+            return list_view
+        return FeedIndexView(feed_file, data, count, list_view)
+
+    def start(self):
+        if self.greenlet is None or self.greenlet.dead:
+            self.greenlet = gevent.spawn(self.run)
+
+    def run(self):
+        lock = open('{}.lock'.format(self.path.rstrip(os.sep)), 'a')
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except IOError:
+                gevent.sleep(self.timeout)
+        self.open()
+        while True:
+            try:
+                self.sync(feed='longpoll', timeout=int(self.timeout * 1000))
+            except Exception as e:
+                LOGGER.warning('Feed index sync failed: {}'.format(e), extra={'MESSAGE_ID': 'feed_index_sync_error'})
+                gevent.sleep(self.timeout)
+
+    def open(self):
+        """Open the files for writing and read back the live record of every document."""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        self.docs = {}
+        self.seq = None
+        self.applied = 0
+        for key, feed_file in self.files.items():
+            feed_file.open()
+            for position, seq, dead, doc_id in feed_file.records():
+                self.applied = max(self.applied, seq)
+                if dead:
+                    feed_file.dead += 1
+                else:
+                    self.docs.setdefault(doc_id, {})[key] = position
+            feed_file.file.seek(0)
+            seq = HEADER.unpack(feed_file.file.read(HEADER.size))[1]
+            self.seq = seq if self.seq is None else min(self.seq, seq)
+
+    def catch_up(self):
+        while self.sync():
+            pass
+
+    def sync(self, **options):
+        """Apply a batch of changes; returns the number of them.
+
+        Changes up to the last record in the files were applied before
+        a restart from an older checkpoint and are skipped.
+        """
+        result = self.db.changes(since=self.seq, include_docs=True, limit=self.batch, **options)
+        for change in result['results']:
+            self.apply(change)
+        for feed_file in self.files.values():
+            feed_file.checkpoint(result['last_seq'])
+        self.seq = result['last_seq']
+        for key, feed_file in self.files.items():
+            if feed_file.dead >= max(self.batch, feed_file.count * COMPACT_RATIO):
+                self.compact(key)
+        return len(result['results'])
+
+    def compact(self, key):
+        positions = self.files[key].compact(self.seq)
+        for doc_positions in self.docs.values():
+            if key in doc_positions:
+                doc_positions[key] = positions[doc_positions[key]]
+
+    def apply(self, change):
+        seq = change['seq']
+        if seq <= self.applied:
+            return
+        for key, position in self.docs.pop(change['id'], {}).items():
+            self.files[key].kill(position)
+        doc = change.get('doc')
+        if change.get('deleted') or not doc or doc.get('status') == 'draft' or len(doc['_id']) > 64:
+            return
+        mode = u'test' if doc.get('mode') == u'test' else u'' if not doc.get('mode') else None
+        positions = {}
+        for key in ((doc.get('doc_type'), u'_all_'), (doc.get('doc_type'), mode)):
+            if key in self.files:
+                positions[key] = self.files[key].append(seq, doc.get('dateModified', ''), doc['_id'])
+        if positions:
+            self.docs[change['id']] = positions
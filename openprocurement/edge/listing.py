@@ -0,0 +1,625 @@
+# -*- coding: utf-8 -*-
+from json import dumps
+from time import time
+from openprocurement.api.utils import context_unpack, fix_url
+from openprocurement.edge.design import FILTERS, STATS_DIMENSIONS, make_compact_views, make_filter_views, make_list_views, make_stats_views
+from openprocurement.edge.pagination import PageLinks, keyset_options
+from pyramid.response import Response
+from pyramid.settings import aslist
+
+LISTINGS = {}
+WAIT_FEEDS = (u'longpoll', u'continuous')
+
+
+def get_projections(settings):
+    """Extra list projections configured with ``<doc_name>s.projections``.
+
+    Every whitespace separated entry of the setting is a comma separated
+    set of fields. Returns ``{doc_name: [(fields, feeds), ...]}`` with
+    the narrowest projections first.
+    """
+    projections = {}
+    for name, listing in LISTINGS.items():
+        projections[name] = sorted([
+            (frozenset(fields.split(',')), listing.projection_views(fields.split(',')))
+            for fields in aslist(settings.get('{}s.projections'.format(name), ''))
+        ], key=lambda i: len(i[0]))
+    return projections
+
+
+def get_stale_bounds(settings):
+    """Bounded staleness configured with ``stale.<feed>[.<mode>] = <seconds>``.
+
+    Returns ``{(feed, mode): seconds}``, ``mode`` is None for the whole
+    feed; 0 seconds means fresh reads.
+    """
+    bounds = {}
+    for key, value in settings.items():
+        if key.startswith('stale.'):
+            parts = key.split('.', 2)[1:]
+            bounds[(parts[0], parts[1] if len(parts) > 1 else None)] = float(value)
+    return bounds
+
+
+def dated_item(x, fields):
+    return {'id': x.id, 'dateModified': x.key}
+
+
+def filtered_item(x, fields):
+    return {'id': x.id, 'dateModified': x.key[-1]}
+
+
+def changes_item(x, fields):
+    return {'id': x.id, 'dateModified': x.value['dateModified']}
+
+
+def compact_changes_item(x, fields):
+    return {'id': x.id, 'dateModified': x.value}
+
+
+def projected_item(x, fields):
+    return dict([(i, j) for i, j in x.value.items() + [('id', x.id), ('dateModified', x.key)] if i in fields])
+
+
+def projected_changes_item(x, fields):
+    return dict([(i, j) for i, j in x.value.items() + [('id', x.id)] if i in fields])
+
+
+def doc_item(x, fields):
+    return dict([(k, j) for k, j in x[u'doc'].items() if k in fields])
+
+
+# list items of view rows by feed and kind of view, given the fields to keep
+ITEMS = {
+    u'dateModified': {
+        'plain': dated_item,
+        'compact': dated_item,
+        'filtered': filtered_item,
+        'projected': projected_item,
+        'docs': doc_item,
+    },
+    u'changes': {
+        'plain': changes_item,
+        'compact': compact_changes_item,
+        'filtered': compact_changes_item,
+        'projected': projected_changes_item,
+        'docs': doc_item,
+    },
+}
+
+
+class ListQuery(object):
+    """State of one list request, as parsed by ``Listing.query``.
+
+    ``params`` and ``pparams`` are the query strings of the next and
+    previous pages; ``keys`` get the feed keys of the first row read and
+    of the last item listed.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.params = {}
+        self.pparams = {}
+        self.keys = {}
+        self.prefix = []
+
+    def add_param(self, name, value):
+        self.params[name] = value
+        self.pparams[name] = value
+
+    def item(self, row):
+        return self.build(row, self.view_fields)
+
+    def view_key(self, key):
+        """View key of a feed ``key``, under the ``prefix`` of filtered views."""
+        return self.prefix + [key] if self.prefix else key
+
+    def feed_key(self, row):
+        """Feed key of a view ``row``."""
+        return row.key[-1] if self.prefix else row.key
+
+
+class Listing(object):
+    """List engine shared by the tenders, auctions, contracts and plans feeds.
+
+    Everything that does not depend on the request (feeds, projected
+    fields, limits, log messages) is prepared once, when the resource
+    module is imported.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+    max_fields_limit = 100
+
+    def __init__(self, route_name, doc_name, feeds, fields):
+        self.route_name = route_name
+        self.doc_name = doc_name
+        self.doc_type = doc_name.capitalize()
+        self.links = PageLinks(route_name)
+        self.feeds = feeds
+        self.fields = frozenset(fields)
+        self.compact = make_compact_views(self.doc_type, '{}s_compact'.format(doc_name))
+        self.filtered = make_filter_views(self.doc_type, '{}s_filters'.format(doc_name))
+        self.stats = make_stats_views(self.doc_type, '{}s_stats'.format(doc_name))
+        self.custom_fields_message = 'Used custom fields for {}s list: {{}}'.format(doc_name)
+        self.custom_fields_message_id = '{}_list_custom'.format(doc_name)
+        LISTINGS[doc_name] = self
+
+    def projection_views(self, fields):
+        fields = sorted(fields)
+        return make_list_views(self.doc_type, '{}s_{}'.format(self.doc_name, '_'.join(fields)), fields)
+
+    def projection(self, registry, fields):
+        for projection_fields, feeds in registry.projections.get(self.doc_name, ()):
+            if projection_fields.issuperset(fields):
+                return feeds
+
+    def limit(self, value, fields):
+        max_limit = self.max_fields_limit if fields else self.max_limit
+        return int(value) if value.isdigit() and max_limit >= int(value) > 0 else self.default_limit
+
+    def __call__(self, resource):
+        request = resource.request
+        query = self.query(request)
+        if query is None:
+            return
+        if query.kind == 'docs':
+            resource.LOGGER.info(self.custom_fields_message.format(','.join(sorted(query.fields))),
+                                 extra=context_unpack(request, {'MESSAGE_ID': self.custom_fields_message_id}))
+        if query.wait == u'continuous':
+            del query.options['limit']
+            return Response(app_iter=self.events(query), content_type='text/event-stream', charset='utf-8')
+        if query.wait:
+            return self.page(query, self.longpoll(query))
+        cache = request.registry.list_cache
+        # only first pages are popular enough to cache, the others are streamed
+        if cache is not None and not query.offset:
+            key = (self.route_name, request.application_url) + tuple(sorted(query.params.items()))
+            data, body = cache.get(key, lambda: self.cached_page(query))
+            if self.streaming(request):
+                return Response(body=body, content_type='application/json', charset='utf-8')
+            return data
+        if not query.fields and self.streaming(request):
+            rows = request.registry.store.iterview(query.list_view, request.registry.stream_batch_size, **query.options)
+            return Response(app_iter=self.stream(query, self.page_items(query, rows)),
+                            content_type='application/json', charset='utf-8')
+        rows = query.list_view(request.registry.db, **query.options)
+        return self.page(query, list(self.page_items(query, rows)))
+
+    def query(self, request):
+        """Parse a list request into a ``ListQuery``; None, with errors added, if it is invalid."""
+        # http://wiki.apache.org/couchdb/HTTP_view_API#Querying_Options
+        registry = request.registry
+        query = ListQuery(request)
+        fields = request.params.get('opt_fields', '')
+        if fields:
+            query.add_param('opt_fields', fields)
+        query.fields = fields = fields.split(',') if fields else []
+        query.view_fields = frozenset(fields + ['dateModified', 'id'])
+        limit = request.params.get('limit', '')
+        if limit:
+            query.add_param('limit', limit)
+        query.limit = limit = self.limit(limit, fields)
+        query.descending = descending = bool(request.params.get('descending'))
+        query.offset = offset = request.params.get('offset', '')
+        if descending:
+            query.params['descending'] = 1
+        else:
+            query.pparams['descending'] = 1
+        feed = request.params.get('feed', '')
+        query.wait = wait = feed if feed in WAIT_FEEDS and not descending else ''
+        query.changes = changes = feed == u'changes' or feed in WAIT_FEEDS
+        query.feed = feed_name = u'changes' if changes else u'dateModified'
+        if feed in self.feeds or feed in WAIT_FEEDS:
+            query.add_param('feed', feed)
+        if wait:
+            timeout = request.params.get('timeout', '')
+            if timeout.isdigit():
+                query.params['timeout'] = timeout
+            query.timeout = self.wait_timeout(registry, timeout)
+            if wait == u'continuous' and not offset:
+                query.offset = offset = request.headers.get('Last-Event-ID', '')
+        filters = [(name, request.params[name]) for name, _ in FILTERS if request.params.get(name)] if registry.list_filters else []
+        for name, value in filters:
+            query.add_param(name, value)
+        mode = request.params.get('mode', '')
+        if mode and mode in self.feeds[feed_name]:
+            query.add_param('mode', mode)
+        else:
+            mode = u''
+        query.mode = mode
+        if changes:
+            if offset:
+                view_offset = registry.offset_codec.decrypt(offset)
+                if not view_offset or not view_offset.isdigit():
+                    request.errors.add('params', 'offset', 'Offset expired/invalid')
+                    request.errors.status = 404
+                    return
+                view_offset = int(view_offset)
+            else:
+                view_offset = 'now' if descending else 0
+        else:
+            view_offset = offset or ('9' if descending else '')
+        query.view_offset = view_offset
+        view_map = self.feeds[feed_name]
+        kind = 'projected' if self.fields.issuperset(fields) else 'docs'
+        if kind == 'docs':
+            projection = self.projection(registry, fields)
+            if projection:
+                view_map = projection[feed_name]
+                kind = 'projected'
+        if not fields:
+            kind = 'plain'
+            if registry.compact_views:
+                view_map = self.compact[feed_name]
+                kind = 'compact'
+        # filtered rows are keyed [names, value, ..., key] and carry compact values
+        if filters:
+            view_map = self.filtered[feed_name]
+            query.prefix = [','.join([name for name, _ in filters])] + [value for _, value in filters]
+            kind = 'docs' if fields else 'filtered'
+        query.kind = kind
+        query.build = ITEMS[feed_name][kind]
+        list_view = view_map[mode]
+        # changes keys are unique, so their pages start right after the offset row
+        options = dict(limit=limit + 1 if offset and not changes else limit,
+                       startkey=query.view_key(view_offset), descending=descending)
+        if query.prefix:
+            options['endkey'] = query.prefix if descending else query.prefix + [{}]
+        if changes and offset:
+            keyset_options(options, descending)
+        # waiting feeds are woken by new changes, so they must see them in the view
+        if not wait and self.stale(registry, list_view, feed_name, mode):
+            options['stale'] = 'update_after'
+        if not wait and not query.prefix:
+            # filtered and waiting feeds are read from the CouchDB views
+            list_view = self.local_view(registry, list_view, changes, mode, None if kind == 'compact' else fields)
+        if kind == 'docs':
+            options['include_docs'] = True
+        query.list_view = list_view
+        query.options = options
+        return query
+
+    def page(self, query, results):
+        next_page, prev_page = self.pages(query)
+        data = {
+            'data': results,
+            'next_page': next_page,
+        }
+        if prev_page:
+            data['prev_page'] = prev_page
+        return data
+
+    def cached_page(self, query):
+        """First page data along with its JSON body, as kept in the list cache."""
+        rows = query.list_view(query.request.registry.db, **query.options)
+        data = self.page(query, list(self.page_items(query, rows)))
+        # the body is sent without beforerender, so document urls are fixed here
+        if query.fields:
+            fix_url(data['data'], query.request.application_url)
+        return data, dumps(data)
+
+    def local_view(self, registry, list_view, changes, mode, fields):
+        """What to read ``list_view`` rows from: the feed index, the store or the view itself.
+
+        ``fields`` are the ones rows are read for, None for compact views;
+        the feed index only has compact changes rows.
+        """
+        if changes and fields is None and registry.feed_index is not None:
+            view = registry.feed_index.list_view(list_view, self.doc_type, mode)
+            if view is not list_view:
+                return view
+        return registry.store.list_view(list_view, self.doc_type, u'changes' if changes else u'dateModified', mode, fields)
+
+    def stale(self, registry, list_view, feed, mode):
+        """Whether ``list_view`` may be read with ``stale=update_after``.
+
+        Without a bound for the feed and mode it depends on the global
+        ``update_after`` setting; with one, only while the view index
+        lags behind the database less than the bound.
+        """
+        bounds = registry.stale_bounds
+        bound = bounds.get((feed, mode), bounds.get((feed, None)))
+        if bound is None:
+            return registry.update_after
+        if bound <= 0:
+            return False
+        if registry.index_lag(registry.db, list_view.design) <= bound:
+            return True
+        registry.index_lag.refreshed(list_view.design, registry.changes_follower.seq)
+        return False
+
+    def streaming(self, request):
+        return request.registry.stream_listing and getattr(request, 'override_renderer', None) is None
+
+    def wait_timeout(self, registry, value):
+        """Seconds to wait for changes: ``timeout`` milliseconds capped by ``longpoll_timeout``."""
+        if value.isdigit():
+            return min(int(value) / 1000.0, registry.longpoll_timeout)
+        return registry.longpoll_timeout
+
+    def wait_key(self, query, offset, seq):
+        """Key of the view reads shared by requests waiting on the same page of the feed at ``seq``."""
+        params = tuple(sorted([(k, v) for k, v in query.params.items() if k not in ('offset', 'timeout')]))
+        return (self.route_name, offset, seq) + params
+
+    def read_page(self, query):
+        """Feed keys and items of a page, read from the view."""
+        query.keys = {}
+        rows = query.list_view(query.request.registry.db, **query.options)
+        return query.keys, list(self.page_items(query, rows))
+
+    def longpoll(self, query):
+        """Page items, waiting up to ``query.timeout`` seconds for the first of them.
+
+        Requests waiting on the same page share every view read.
+        """
+        registry = query.request.registry
+        follower = registry.changes_follower
+        deadline = time() + query.timeout
+        while True:
+            seq = follower.start()
+            query.keys, results = registry.list_flight(self.wait_key(query, query.offset, seq), lambda: self.read_page(query))
+            remaining = deadline - time()
+            if results or remaining <= 0 or not follower.wait(seq, remaining):
+                return results
+
+    def events(self, query):
+        """Server-sent events with new items as they reach the changes view.
+
+        Event ids are encrypted offsets, so reconnecting clients resume
+        with ``Last-Event-ID`` (or ``offset``). A heartbeat comment is
+        sent after every ``longpoll_timeout`` seconds without changes;
+        an explicit ``timeout`` closes the stream instead. Once streams
+        have caught up, the rows read after a change are shared by the
+        streams waiting at the same offset.
+        """
+        request = query.request
+        registry = request.registry
+        codec = registry.offset_codec
+        follower = registry.changes_follower
+        view_name = '{}/{}'.format(query.list_view.design, query.list_view.name)
+        idle = not request.params.get('timeout', '').isdigit()
+        view_offset = query.view_offset
+        seq = follower.start()
+        query.options['startkey'] = query.view_key(view_offset)
+        rows = registry.db.iterview(view_name, registry.stream_batch_size, **query.options)
+        while True:
+            for x in rows:
+                key = query.feed_key(x)
+                if key == view_offset:
+                    continue
+                view_offset = key
+                yield 'id: {}\ndata: {}\n\n'.format(codec.encrypt(view_offset), dumps(query.item(x)))
+            if not follower.wait(seq, query.timeout):
+                if not idle:
+                    return
+                yield ': heartbeat\n\n'
+            seq = follower.start()
+            query.options['startkey'] = query.view_key(view_offset)
+            rows = registry.list_flight(self.wait_key(query, view_offset, seq), lambda: list(
+                registry.db.iterview(view_name, registry.stream_batch_size, **query.options)))
+
+    def page_items(self, query, rows):
+        """Yield page items from view ``rows``.
+
+        A row equal to the requested offset was already served on the
+        previous page and is skipped; otherwise the extra row fetched for
+        that check is dropped (changes views start past that row and
+        fetch no extra one). Keys of the first row read and of the last
+        item yielded are recorded in ``query.keys``.
+        """
+        keys = query.keys
+        count = 0
+        for x in rows:
+            key = query.feed_key(x)
+            if 'first' not in keys:
+                keys['first'] = key
+                if query.offset and query.view_offset == key:
+                    continue
+            if count == query.limit:
+                break
+            keys['last'] = key
+            count += 1
+            yield query.item(x)
+
+    def pages(self, query):
+        keys, params, pparams, offset = query.keys, query.params, query.pparams, query.offset
+        if 'first' in keys:
+            params['offset'] = keys.get('last', keys['first'])
+            pparams['offset'] = query.view_offset if offset and query.view_offset != keys['first'] else keys['first']
+            if query.changes:
+                params['offset'], pparams['offset'] = query.request.registry.offset_codec.encrypt_many([params['offset'], pparams['offset']])
+        else:
+            params['offset'] = offset
+            pparams['offset'] = offset
+        next_page = self.links(query.request, params)
+        prev_page = None
+        if query.descending or offset:
+            prev_page = self.links(query.request, pparams)
+        return next_page, prev_page
+
+    def stream(self, query, items):
+        yield '{"data": ['
+        for n, item in enumerate(items):
+            yield (', ' if n else '') + dumps(item)
+        next_page, prev_page = self.pages(query)
+        yield '], "next_page": ' + dumps(next_page)
+        if prev_page:
+            yield ', "prev_page": ' + dumps(prev_page)
+        yield '}'
+
+    def bulk_get(self, resource):
+        """Documents with the ids given as body ``data``, read with one ``_all_docs`` query.
+
+        Ids not found (or of other document types) are listed in ``missing``.
+        """
+        request = resource.request
+        try:
+            ids = request.json_body['data']
+        except (ValueError, KeyError, TypeError):
+            ids = None
+        if not isinstance(ids, list) or not all(isinstance(i, basestring) for i in ids):
+            request.errors.add('body', 'data', 'Expecting a list of ids')
+            request.errors.status = 422
+            return
+        if len(ids) > request.registry.bulk_get_limit:
+            request.errors.add('body', 'data', 'At most {} ids are allowed'.format(request.registry.bulk_get_limit))
+            request.errors.status = 422
+            return
+        rows = request.registry.db.view('_all_docs', keys=ids, include_docs=True)
+        missing = []
+        docs = self.bulk_docs(rows, missing)
+        if self.streaming(request):
+            return Response(app_iter=self.bulk_stream(request, docs, missing), content_type='application/json', charset='utf-8')
+        return {'data': list(docs), 'missing': missing}
+
+    def bulk_docs(self, rows, missing):
+        for row in rows:
+            doc = row.doc
+            if doc is None or doc.get('doc_type') != self.doc_type:
+                missing.append(row.key)
+                continue
+            yield dict([(k, v) for k, v in doc.items() if k not in ('_id', '_rev', 'doc_type')])
+
+    def bulk_stream(self, request, docs, missing):
+        yield '{"data": ['
+        for n, doc in enumerate(docs):
+            # streamed without beforerender, which fixes document urls
+            fix_url(doc, request.application_url)
+            yield (', ' if n else '') + dumps(doc)
+        yield '], "missing": ' + dumps(missing) + '}'
+
+    def search(self, resource):
+        """Documents with every word of ``q``, best ranked first, from the local search index.
+
+        Items are listed like the list feeds, ``offset`` is the number of
+        results to skip.
+        """
+        request = resource.request
+        index = request.registry.search_index
+        if index is None:
+            request.errors.add('url', 'search', 'Not Found')
+            request.errors.status = 404
+            return
+        q = request.params.get('q', '')
+        if not q.strip():
+            request.errors.add('params', 'q', 'Expecting search words')
+            request.errors.status = 422
+            return
+        fields = request.params.get('opt_fields', '')
+        fields = fields.split(',') if fields else []
+        limit = self.limit(request.params.get('limit', ''), fields)
+        offset = request.params.get('offset', '')
+        offset = int(offset) if offset.isdigit() else 0
+        rows = index.search(self.doc_type, q, request.params.get('mode', ''), limit, offset)
+        if not fields:
+            return {'data': [{'id': i, 'dateModified': j} for i, j in rows]}
+        view_fields = set(fields + ['dateModified', 'id'])
+        docs = request.registry.db.view('_all_docs', keys=[i for i, _ in rows], include_docs=True)
+        return {'data': [dict([(k, v) for k, v in x.doc.items() if k in view_fields]) for x in docs if x.doc is not None]}
+
+    def statistics(self, resource):
+        """Counts and ``value.amount`` stats grouped by the ``by`` dimension and up to ``group_level`` dimensions.
+
+        Results are cached until the update seq of the view index, as
+        read by ``index_lag``, moves on. While the database is ahead of
+        the index, the view is read with ``stale=update_after`` (at most
+        once per ``index_lag_interval``) so that CouchDB catches it up.
+        """
+        request = resource.request
+        registry = request.registry
+        if not registry.stats_views:
+            request.errors.add('url', 'stats', 'Not Found')
+            request.errors.status = 404
+            return
+        by = request.params.get('by', STATS_DIMENSIONS[0])
+        if by not in self.stats:
+            request.errors.add('params', 'by', 'Expecting one of: {}'.format(', '.join(STATS_DIMENSIONS)))
+            request.errors.status = 422
+            return
+        group_level = request.params.get('group_level', '')
+        group_level = int(group_level) if group_level.isdigit() and len(STATS_DIMENSIONS) >= int(group_level) > 0 else 1
+        view_map = self.stats[by]
+        stats_view = view_map.get(request.params.get('mode', ''), view_map[u''])
+        seq = registry.index_lag.seq(registry.db, stats_view.design)
+        key = (stats_view.design, stats_view.name, group_level)
+        cached = registry.stats_cache.get(key)
+        if cached is None or cached[0] != seq:
+            options = dict(group_level=group_level)
+            if cached is not None:
+                options['stale'] = 'update_after'
+            data = [
+                dict([('key', x.key)] + [(i, x.value[i]) for i in ('count', 'sum', 'min', 'max')])
+                for x in stats_view(registry.db, **options)
+            ]
+            # seq, data, time the index was last asked to catch up
+            cached = (seq, data, 0)
+            registry.stats_cache.set(key, cached)
+        elif registry.changes_follower.start() != seq and cached[2] + registry.index_lag.interval < time():
+            # view results are only fetched when read
+            stats_view(registry.db, limit=0, stale='update_after').rows
+            registry.stats_cache.set(key, (seq, cached[1], time()))
+        return {'data': cached[1]}
+
+    def feed(self, resource):
+        """Whole changes feed as newline-delimited JSON for mirrors.
+
+        A ``checkpoint`` line follows every ``stream_batch_size`` rows and
+        ends the stream; passing it back as ``since`` resumes the feed.
+        """
+        request = resource.request
+        if request.authenticated_role == 'anonymous':
+            request.errors.add('url', 'permission', 'Forbidden')
+            request.errors.status = 403
+            return
+        since = request.params.get('since', '')
+        startkey = 0
+        if since:
+            seq = request.registry.offset_codec.decrypt(since)
+            if not seq or not seq.isdigit():
+                request.errors.add('params', 'since', 'Checkpoint expired/invalid')
+                request.errors.status = 404
+                return
+            startkey = int(seq) + 1
+        fields = request.params.get('opt_fields', '')
+        fields = fields.split(',') if fields else []
+        view_map = self.feeds[u'changes']
+        view_fields = frozenset(fields + ['dateModified', 'id'])
+        build = projected_changes_item
+        compact = not fields and request.registry.compact_views
+        if compact:
+            view_map = self.compact[u'changes']
+            build = compact_changes_item
+        elif not self.fields.issuperset(fields):
+            projection = self.projection(request.registry, fields)
+            if not projection:
+                request.errors.add('params', 'opt_fields', 'Not available for the feed')
+                request.errors.status = 422
+                return
+            view_map = projection[u'changes']
+        mode = request.params.get('mode', '')
+        mode = mode if mode in view_map else u''
+        list_view = view_map[mode]
+        options = dict(startkey=startkey)
+        if self.stale(request.registry, list_view, u'changes', mode):
+            options['stale'] = 'update_after'
+        list_view = self.local_view(request.registry, list_view, True, mode, None if compact else fields)
+        rows = request.registry.store.iterview(list_view, request.registry.stream_batch_size, **options)
+        return Response(app_iter=self.feed_lines(request, rows, build, view_fields, since),
+                        content_type='application/x-ndjson', charset='utf-8')
+
+    def feed_lines(self, request, rows, build, fields, checkpoint):
+        codec = request.registry.offset_codec
+        batch = request.registry.stream_batch_size
+        n = 0
+        for n, x in enumerate(rows, 1):
+            yield dumps(build(x, fields)) + '\n'
+            checkpoint = x.key
+            if n % batch == 0:
+                yield dumps({'checkpoint': codec.encrypt(checkpoint)}) + '\n'
+        if n and n % batch == 0:
+            return
+        if not isinstance(checkpoint, basestring):
+            checkpoint = codec.encrypt(checkpoint)
+        yield dumps({'checkpoint': checkpoint}) + '\n'
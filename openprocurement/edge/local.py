@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import fcntl
+import gevent
+import os
+import re
+import sqlite3
+from abc import ABCMeta, abstractmethod
+from glob import glob
+from json import dumps, loads
+from logging import getLogger
+from time import time
+
+LOGGER = getLogger(__name__)
+# WAL, shared memory and rollback journal files of a database
+SIDE_FILES = re.compile(r'-(wal|shm|journal)$')
+
+
+class ChangesIndex(object):
+    """SQLite file kept up to date from the CouchDB ``_changes`` feed.
+
+    Each batch of changes is applied along with its checkpoint, in one
+    transaction. Only the worker process holding the lock file writes
+    it; the rest only read. ``path`` is a link to the current file; a
+    missing or outdated one is rebuilt into a new file, which the link
+    is switched to when it has caught up, so reads go on meanwhile.
+    Files are never replaced while open, as their WAL files would then
+    belong to another database. Subclasses define ``name``, ``version``,
+    ``schema`` and ``apply``.
+    """
+
+    __metaclass__ = ABCMeta
+
+    name = None
+    version = None
+    schema = []
+
+    def __init__(self, db, path, batch=200, timeout=30):
+        self.db = db
+        self.path = path
+        self.batch = batch
+        self.timeout = timeout
+        self.greenlet = None
+        self.conn = None
+        self.file = None
+
+    def current_file(self):
+        """File ``path`` links to, or ``path`` itself if it is a file written before links."""
+        try:
+            return os.path.join(os.path.dirname(self.path), os.readlink(self.path))
+        except OSError:
+            return self.path
+
+    def connect(self, path=None):
+        return sqlite3.connect(path or self.current_file())
+
+    def reader(self):
+        """Connection to read with, None while there is no file yet.
+
+        It is shared by the requests of a worker and reopened on the new
+        file after a rebuild; the old one is closed once lists still
+        streamed from it are done with their cursors.
+        """
+        path = self.current_file()
+        if path != self.file:
+            if not os.path.exists(path):
+                return None
+            self.conn, self.file = self.connect(path), path
+        return self.conn
+
+    def start(self):
+        if self.greenlet is None or self.greenlet.dead:
+            self.greenlet = gevent.spawn(self.run)
+
+    def run(self):
+        lock = open('{}.lock'.format(self.path), 'a')
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except IOError:
+                gevent.sleep(self.timeout)
+        if not self.current():
+            self.rebuild()
+        conn = self.connect()
+        while True:
+            try:
+                self.sync(conn, feed='longpoll', timeout=int(self.timeout * 1000))
+            except Exception as e:
+                LOGGER.warning('{} sync failed: {}'.format(self.name, e),
+                               extra={'MESSAGE_ID': '{}_sync_error'.format(self.name.replace(' ', '_'))})
+                gevent.sleep(self.timeout)
+
+    def current(self):
+        if not os.path.exists(self.path):
+            return False
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone() == (self.version,)
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+
+    def rebuild(self):
+        """Apply every change to a new file, then link ``path`` to it.
+
+        Readers move to the new file on their next read; files before the
+        previous one, and those of interrupted rebuilds, are removed.
+        """
+        previous = self.current_file()
+        path = '{}.{}'.format(self.path, int(time() * 1000))
+        LOGGER.info('Rebuilding {}'.format(self.name), extra={'MESSAGE_ID': '{}_rebuild'.format(self.name.replace(' ', '_'))})
+        conn = self.connect(path)
+        # readers do not block the writer and the other way round
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            for statement in self.schema:
+                conn.execute(statement)
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (self.version,))
+        self.catch_up(conn)
+        conn.close()
+        link = '{}.link'.format(path)
+        os.symlink(os.path.basename(path), link)
+        os.rename(link, self.path)
+        for i in glob('{}.[0-9]*'.format(self.path)):
+            if SIDE_FILES.sub('', i) not in (path, previous):
+                os.remove(i)
+
+    def catch_up(self, conn):
+        while self.sync(conn):
+            pass
+
+    def seq(self, conn):
+        """Seq of the last change applied to the file of ``conn``."""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()
+        return loads(row[0]) if row else 0
+
+    def sync(self, conn, **options):
+        """Apply a batch of changes; returns the number of them."""
+        result = self.db.changes(since=self.seq(conn), include_docs=True, limit=self.batch, **options)
+        with conn:
+            for change in result['results']:
+                self.apply(conn, change)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('seq', ?)", (dumps(result['last_seq']),))
+        return len(result['results'])
+
+    @abstractmethod
+    def apply(self, conn, change):
+        """Apply ``change`` of the ``_changes`` feed within the transaction of ``conn``."""
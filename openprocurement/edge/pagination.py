@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from pyramid.encode import urlencode
+
+# docid bounds that put a startkey past every row with that key
+KEYSET_DOCID = {False: u'\ufff0', True: u''}
+
+
+def keyset_options(options, descending):
+    """Start a view query after the rows with its ``startkey``.
+
+    Only for views with unique keys (the ``local_seq`` of changes
+    views), where that row was the last one of the previous page.
+    """
+    options['startkey_docid'] = KEYSET_DOCID[bool(descending)]
+    return options
+
+
+class PageLinks(object):
+    """``next_page``/``prev_page`` links of a list route.
+
+    The route path is generated once and links are formatted from it
+    the same way ``route_path`` and ``route_url`` build them.
+    """
+
+    def __init__(self, route_name):
+        self.route_name = route_name
+        self.route = None
+
+    def __call__(self, request, params):
+        if self.route is None:
+            self.route = request.route_url(self.route_name, _app_url='')
+        path = '{}?{}'.format(self.route, urlencode(params, doseq=True))
+        return {
+            "offset": params['offset'],
+            "path": request.script_name + path,
+            "uri": request.application_url + path
+        }
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from couchdb.http import ServerError
+from jsonpatch import make_patch
+
+# local documents are neither replicated nor seen by views and the changes feed
+REVISIONS_ID = '_local/revisions_{}'
+
+
+def public_doc(doc):
+    return dict([(k, v) for k, v in doc.items() if k not in ('_id', '_rev', 'doc_type')])
+
+
+def add_revision(db, old, new, size):
+    """Keep the patch from ``old`` to the saved ``new`` document, at most ``size`` of them.
+
+    Patches are kept in a local document along with the revision they
+    lead to; the chain restarts if that is not the revision of ``old``.
+    """
+    history_id = REVISIONS_ID.format(old['_id'])
+    history = db.get(history_id, {'_id': history_id})
+    revisions = history.get('revisions', []) if history.get('rev') == old['_rev'] else []
+    revisions.append({'rev': old['_rev'], 'patch': make_patch(public_doc(old), public_doc(new)).patch})
+    history['revisions'] = revisions[-size:]
+    history['rev'] = new['_rev']
+    db.save(history)
+
+
+def revision_patch(db, doc_id, doc_type, doc, since_rev):
+    """RFC 6902 patch from revision ``since_rev`` to ``doc``, None if the revision is gone.
+
+    Patches kept by the bridge are used first, then the old revision if
+    CouchDB still has it.
+    """
+    if since_rev == doc.rev:
+        return []
+    history = db.get(REVISIONS_ID.format(doc_id))
+    if history and history.get('rev') == doc.rev:
+        revs = [i['rev'] for i in history['revisions']]
+        if since_rev in revs:
+            return [op for i in history['revisions'][revs.index(since_rev):] for op in i['patch']]
+    try:
+        old = db.get(doc_id, rev=since_rev)
+    except ServerError:
+        old = None
+    if old is not None and old.get('doc_type') == doc_type:
+        return make_patch(public_doc(old), doc).patch
+
+
+def document_data(request, name):
+    """Single document response, a patch against ``since_rev`` if it is still known.
+
+    The current revision is sent as the ``ETag``.
+    """
+    doc = request.validated[name]
+    request.response.etag = doc.rev
+    since_rev = request.params.get('since_rev')
+    if since_rev and not request.params.get('opt_fields'):
+        patch = revision_patch(request.registry.db, request.validated['{}_id'.format(name)], name.capitalize(), doc, since_rev)
+        if patch is not None:
+            return {'patch': patch}
+    return {'data': doc}
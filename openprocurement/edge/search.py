@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import re
+from openprocurement.edge.local import ChangesIndex
+
+SCHEMA_VERSION = '1'
+SCHEMA = [
+    'CREATE TABLE docs (rowid INTEGER PRIMARY KEY, id TEXT UNIQUE, doc_type TEXT, mode TEXT, dateModified TEXT)',
+    "CREATE VIRTUAL TABLE search USING fts5(public_id, title, description, items, procuring_entity, tokenize='unicode61 remove_diacritics 2')",
+]
+DOC_TYPES = ('Tender', 'Auction', 'Contract', 'Plan')
+SEARCH_QUERY = '''SELECT docs.id, docs.dateModified FROM search JOIN docs ON docs.rowid = search.rowid
+    WHERE search MATCH ? AND docs.doc_type = ?{} ORDER BY search.rank LIMIT ? OFFSET ?'''
+MODE_CONDITIONS = {
+    u'': " AND docs.mode = ''",
+    u'test': " AND docs.mode = 'test'",
+    u'_all_': '',
+}
+TERMS = re.compile(r'\w+', re.UNICODE)
+
+
+def texts(*values):
+    return u' '.join([i for i in values if isinstance(i, basestring)])
+
+
+def classification_texts(item):
+    classifications = [item.get('classification') or {}] + (item.get('additionalClassifications') or [])
+    return texts(*[j for i in classifications for j in (i.get('id'), i.get('description'))])
+
+
+def doc_columns(doc):
+    """Values of the ``search`` columns of ``doc``."""
+    entity = doc.get('procuringEntity') or {}
+    identifier = entity.get('identifier') or {}
+    return (
+        doc.get('{}ID'.format(doc['doc_type'].lower()), ''),
+        texts(doc.get('title'), doc.get('title_en'), doc.get('title_ru')),
+        texts(doc.get('description'), doc.get('description_en'), doc.get('description_ru')),
+        u' '.join([texts(i.get('description'), i.get('description_en'), classification_texts(i))
+                   for i in doc.get('items') or [] if isinstance(i, dict)]),
+        texts(entity.get('name'), identifier.get('id'), identifier.get('legalName')),
+    )
+
+
+def match_query(q):
+    """FTS5 query matching documents with every word of ``q``, None if there are none."""
+    terms = TERMS.findall(q)
+    if terms:
+        return u' '.join([u'"{}"'.format(i) for i in terms])
+
+
+class SearchIndex(ChangesIndex):
+    """Full-text index of the documents in a SQLite FTS5 file."""
+
+    name = 'search index'
+    version = SCHEMA_VERSION
+    schema = SCHEMA
+
+    def apply(self, conn, change):
+        doc = change.get('doc')
+        if change.get('deleted') or not doc or doc.get('doc_type') not in DOC_TYPES or doc.get('status') == 'draft':
+            self.remove(conn, change['id'])
+        else:
+            self.add(conn, doc)
+
+    def add(self, conn, doc):
+        row = conn.execute('SELECT rowid FROM docs WHERE id = ?', (doc['_id'],)).fetchone()
+        if row:
+            conn.execute('DELETE FROM search WHERE rowid = ?', row)
+            conn.execute('UPDATE docs SET mode = ?, dateModified = ? WHERE rowid = ?',
+                         (doc.get('mode', ''), doc.get('dateModified'), row[0]))
+            rowid = row[0]
+        else:
+            rowid = conn.execute('INSERT INTO docs (id, doc_type, mode, dateModified) VALUES (?, ?, ?, ?)',
+                                 (doc['_id'], doc['doc_type'], doc.get('mode', ''), doc.get('dateModified'))).lastrowid
+        conn.execute('INSERT INTO search (rowid, public_id, title, description, items, procuring_entity) VALUES (?, ?, ?, ?, ?, ?)',
+                     (rowid,) + doc_columns(doc))
+
+    def remove(self, conn, doc_id):
+        row = conn.execute('SELECT rowid FROM docs WHERE id = ?', (doc_id,)).fetchone()
+        if row:
+            conn.execute('DELETE FROM search WHERE rowid = ?', row)
+            conn.execute('DELETE FROM docs WHERE rowid = ?', row)
+
+    def search(self, doc_type, q, mode=u'', limit=100, offset=0):
+        """``(id, dateModified)`` of ``doc_type`` documents matching ``q``, best ranked first."""
+        query = match_query(q)
+        conn = self.reader()
+        if not query or conn is None:
+            return []
+        condition = MODE_CONDITIONS.get(mode, MODE_CONDITIONS[u''])
+        return conn.execute(SEARCH_QUERY.format(condition), (query, doc_type, limit, offset)).fetchall()
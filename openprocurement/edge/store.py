@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from couchdb.client import Row
+from couchdb.design import ViewDefinition
+from json import dumps, loads
+from openprocurement.edge.local import ChangesIndex
+from time import time
+
+SCHEMA_VERSION = '1'
+SCHEMA = [
+    'CREATE TABLE docs (id TEXT PRIMARY KEY, doc_type TEXT, mode TEXT, status TEXT, dateModified TEXT, seq INTEGER, doc TEXT)',
+    'CREATE INDEX docs_by_dateModified ON docs (doc_type, mode, dateModified, id)',
+    'CREATE INDEX docs_all_by_dateModified ON docs (doc_type, dateModified, id)',
+    'CREATE INDEX docs_by_seq ON docs (doc_type, mode, seq)',
+    'CREATE INDEX docs_all_by_seq ON docs (doc_type, seq)',
+]
+FEED_COLUMNS = {
+    u'dateModified': 'dateModified',
+    u'changes': 'seq',
+}
+MODE_CONDITIONS = {
+    u'': " AND mode = ''",
+    u'test': " AND mode = 'test'",
+    u'_all_': '',
+}
+
+
+class CouchStore(object):
+    """Documents and list views read from CouchDB."""
+
+    # whether documents are read from a local replica
+    local = False
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, doc_id):
+        return self.db.get(doc_id)
+
+    def list_view(self, list_view, doc_type, feed, mode, fields):
+        """What to read ``list_view`` rows from; called like the view itself.
+
+        ``fields`` are the ones the rows are read for, None for compact views.
+        """
+        return list_view
+
+    def iterview(self, list_view, batch, **options):
+        """Rows of ``list_view`` read in batches, unless they are read locally."""
+        if isinstance(list_view, ViewDefinition):
+            return self.db.iterview('{}/{}'.format(list_view.design, list_view.name), batch, **options)
+        return list_view(self.db, **options)
+
+
+class StoreView(object):
+    """List view rows read from a ``SQLiteStore``, in place of ``list_view``."""
+
+    def __init__(self, store, list_view, doc_type, feed, mode, fields):
+        self.store = store
+        self.design = list_view.design
+        self.name = list_view.name
+        self.doc_type = doc_type
+        self.feed = feed
+        self.mode = mode
+        self.fields = fields
+
+    def __call__(self, db, **options):
+        return self.store.rows(self, **options)
+
+
+class SQLiteStore(ChangesIndex, CouchStore):
+    """Local SQLite replica of the database for the read path.
+
+    Documents are kept as JSON by id, indexed for the ``dateModified``
+    and ``changes`` list feeds. Until the replica is built, and while it
+    lags more than ``max_lag`` seconds behind the database, reads go to
+    CouchDB.
+    """
+
+    name = 'local store'
+    version = SCHEMA_VERSION
+    schema = SCHEMA
+    local = True
+
+    def __init__(self, db, path, follower, max_lag=1, batch=200, timeout=30):
+        ChangesIndex.__init__(self, db, path, batch, timeout)
+        self.follower = follower
+        self.max_lag = max_lag
+
+    def apply(self, conn, change):
+        doc = change.get('doc')
+        if change.get('deleted') or not doc or not doc.get('doc_type'):
+            conn.execute('DELETE FROM docs WHERE id = ?', (change['id'],))
+        else:
+            conn.execute('INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                doc['_id'], doc['doc_type'], doc.get('mode') or '', doc.get('status') or '',
+                doc.get('dateModified'), change['seq'], dumps(doc),
+            ))
+
+    def fresh_reader(self):
+        """Connection to read with, None while there is no file or it lags too far behind."""
+        conn = self.reader()
+        if conn is None:
+            return None
+        self.follower.start()
+        since = self.follower.behind_since(self.seq(conn))
+        if since is not None and time() - since > self.max_lag:
+            return None
+        return conn
+
+    def get(self, doc_id):
+        conn = self.fresh_reader()
+        if conn is None:
+            return CouchStore.get(self, doc_id)
+        row = conn.execute('SELECT doc FROM docs WHERE id = ?', (doc_id,)).fetchone()
+        return loads(row[0]) if row else None
+
+    def list_view(self, list_view, doc_type, feed, mode, fields):
+        if self.fresh_reader() is None:
+            return list_view
+        return StoreView(self, list_view, doc_type, feed, mode, fields)
+
+    def iterview(self, list_view, batch, **options):
+        if isinstance(list_view, StoreView):
+            return self.rows(list_view, batch=batch, **options)
+        return CouchStore.iterview(self, list_view, batch, **options)
+
+    def rows(self, view, limit=None, startkey=None, descending=False, include_docs=False, batch=None, **options):
+        """Rows like those of the list view ``view`` stands for, fetched ``batch`` at a time.
+
+        Keys are ``dateModified`` or the ``_changes`` seq, which is the
+        ``local_seq`` of the document; values hold ``view.fields`` (and
+        ``dateModified`` for the changes feed) or, for compact views,
+        ``null`` or ``dateModified``. Documents are only read when they
+        are included or values are taken from them.
+        """
+        column = FEED_COLUMNS[view.feed]
+        docs = include_docs or view.fields is not None
+        query = "SELECT id, {}, dateModified{} FROM docs WHERE doc_type = ? AND status != 'draft'{}".format(
+            column, ', doc' if docs else '', MODE_CONDITIONS.get(view.mode, MODE_CONDITIONS[u'']))
+        args = [view.doc_type]
+        # the changes feed starts descending lists with 'now'
+        if startkey is not None and not (view.feed == u'changes' and isinstance(startkey, basestring)):
+            if 'startkey_docid' in options:
+                query += ' AND {} {} ?'.format(column, '<' if descending else '>')
+            else:
+                query += ' AND {} {} ?'.format(column, '<=' if descending else '>=')
+            args.append(startkey)
+        query += ' ORDER BY {0} {1}, id {1}'.format(column, 'DESC' if descending else 'ASC')
+        if limit is not None:
+            query += ' LIMIT ?'
+            args.append(limit)
+        changes = view.feed == u'changes'
+        cursor = self.reader().execute(query, args)
+        while True:
+            results = cursor.fetchmany(batch) if batch else cursor.fetchall()
+            for result in results:
+                row = {'id': result[0], 'key': result[1]}
+                if docs:
+                    doc = loads(result[3])
+                if include_docs:
+                    row['doc'] = doc
+                if view.fields is None:
+                    row['value'] = result[2] if changes else None
+                else:
+                    row['value'] = dict([(i, doc[i]) for i in view.fields if doc.get(i)])
+                    if changes:
+                        row['value']['dateModified'] = result[2]
+                yield Row(row)
+            if not batch or not results:
+                return
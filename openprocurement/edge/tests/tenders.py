@@ -1,10 +1,23 @@
 # -*- coding: utf-8 -*-
+import gevent
+import json
+import os
+import shutil
 import unittest
 from uuid import uuid4
 from copy import deepcopy
+from tempfile import mkdtemp
 
 from openprocurement.api import ROUTE_PREFIX
 from openprocurement.api.models import get_now
+from openprocurement.api.utils import decrypt, encrypt
+from openprocurement.edge.cache import DocumentCache, LRUCache, ResponseCache, SingleFlight
+from openprocurement.edge.changes import ChangesFollower
+from openprocurement.edge.feedindex import FeedIndex
+from openprocurement.edge.local import ChangesIndex
+from openprocurement.edge.revisions import REVISIONS_ID, add_revision
+from openprocurement.edge.search import SearchIndex
+from openprocurement.edge.store import SQLiteStore
 from openprocurement.edge.tests.base import test_tender_data, TenderBaseWebTest, test_award, test_complaint, test_document
 
 
@@ -95,6 +108,7 @@ class TenderResourceTest(TenderBaseWebTest):
         self.assertEqual(set([i['id'] for i in response.json['data']]), set([i['id'] for i in tenders]))
         self.assertEqual(set([i['dateModified'] for i in response.json['data']]), set([i['dateModified'] for i in tenders]))
         self.assertEqual([i['dateModified'] for i in response.json['data']], sorted([i['dateModified'] for i in tenders]))
+        self.assertIn('_design/tenders_compact', self.db)
 
 
         while True:
@@ -170,6 +184,24 @@ class TenderResourceTest(TenderBaseWebTest):
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(len(response.json['data']), 4)
 
+    def test_listing_projection(self):
+        tenders = [self.create_tender() for i in range(3)]
+
+        while True:
+            response = self.app.get('/tenders', params=[('opt_fields', 'title')])
+            self.assertEqual(response.status, '200 OK')
+            if len(response.json['data']) == 3:
+                break
+
+        self.assertEqual(set(response.json['data'][0]), set([u'id', u'dateModified', u'title']))
+        self.assertEqual(set([i['title'] for i in response.json['data']]), set([i['title'] for i in tenders]))
+        self.assertIn('opt_fields=title', response.json['next_page']['uri'])
+
+        response = self.app.get('/tenders?feed=changes', params=[('opt_fields', 'title,value')])
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(len(response.json['data']), 3)
+        self.assertEqual(set(response.json['data'][0]), set([u'id', u'dateModified', u'title', u'value']))
+
     def test_listing_changes(self):
         response = self.app.get('/tenders?feed=changes')
         self.assertEqual(response.status, '200 OK')
@@ -286,6 +318,266 @@ class TenderResourceTest(TenderBaseWebTest):
         self.assertEqual(set([i['dateModified'] for i in response.json['data']]), set([i['dateModified'] for i in tenders]))
         self.assertEqual([i['dateModified'] for i in response.json['data']], sorted([i['dateModified'] for i in tenders]))
 
+    def test_listing_filters(self):
+        data = deepcopy(self.initial_data)
+        data['procurementMethodType'] = u'aboveThresholdUA'
+        tenders = [self.create_tender(data) for i in range(3)]
+        self.create_tender()
+
+        while True:
+            response = self.app.get('/tenders?procurementMethodType=aboveThresholdUA&limit=2')
+            self.assertEqual(response.status, '200 OK')
+            if len(response.json['data']) == 2:
+                break
+        self.assertEqual([i['id'] for i in response.json['data']], [i['id'] for i in tenders[:2]])
+        self.assertIn('procurementMethodType=aboveThresholdUA', response.json['next_page']['uri'])
+
+        response = self.app.get(response.json['next_page']['path'].replace(ROUTE_PREFIX, ''))
+        self.assertEqual([i['id'] for i in response.json['data']], [tenders[2]['id']])
+        self.assertIn('procurementMethodType=aboveThresholdUA', response.json['prev_page']['uri'])
+
+        response = self.app.get('/tenders?status=active&procurementMethodType=aboveThresholdUA&feed=changes&descending=1&opt_fields=title')
+        self.assertEqual([i['id'] for i in response.json['data']], [i['id'] for i in reversed(tenders)])
+        self.assertEqual(set(response.json['data'][0]), set([u'id', u'dateModified', u'title']))
+
+        offset = response.json['next_page']['offset']
+        response = self.app.get('/tenders?status=active&procurementMethodType=aboveThresholdUA&feed=changes&offset={}'.format(offset))
+        self.assertEqual([i['id'] for i in response.json['data']], [i['id'] for i in tenders[1:]])
+
+        response = self.app.get('/tenders?status=cancelled')
+        self.assertEqual(response.json['data'], [])
+        self.assertIn('_design/tenders_filters', self.db)
+
+    def test_feed(self):
+        self.app.authorization = None
+        response = self.app.get('/feed/tenders', status=403)
+        self.assertEqual(response.status, '403 Forbidden')
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'Forbidden', u'location': u'url', u'name': u'permission'}
+        ])
+
+        self.app.authorization = ('Basic', ('broker', ''))
+        tenders = [self.create_tender() for i in range(3)]
+
+        while True:
+            response = self.app.get('/feed/tenders')
+            self.assertEqual(response.status, '200 OK')
+            lines = [json.loads(i) for i in response.body.splitlines()]
+            if len(lines) == 4:
+                break
+
+        self.assertEqual(response.content_type, 'application/x-ndjson')
+        self.assertEqual([i['id'] for i in lines[:-1]], [i['id'] for i in tenders])
+        self.assertEqual(set(lines[0]), set([u'id', u'dateModified']))
+        self.assertIn('checkpoint', lines[-1])
+
+        response = self.app.get('/feed/tenders?since={}'.format(lines[-1]['checkpoint']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual([json.loads(i) for i in response.body.splitlines()], [lines[-1]])
+
+        response = self.app.get('/feed/tenders?since=0', status=404)
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'Checkpoint expired/invalid', u'location': u'params', u'name': u'since'}
+        ])
+
+        response = self.app.get('/feed/tenders?opt_fields=status')
+        self.assertEqual(set(json.loads(response.body.splitlines()[0])), set([u'id', u'dateModified', u'status']))
+
+    def test_longpoll_listing(self):
+        tender = self.create_tender()
+
+        while True:
+            response = self.app.get('/tenders?feed=longpoll&timeout=100')
+            self.assertEqual(response.status, '200 OK')
+            if len(response.json['data']) == 1:
+                break
+        self.assertEqual(response.json['data'][0]['id'], tender['id'])
+        self.assertIn('feed=longpoll', response.json['next_page']['uri'])
+        self.assertIn('timeout=100', response.json['next_page']['uri'])
+
+        response = self.app.get(response.json['next_page']['path'].replace(ROUTE_PREFIX, ''))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data'], [])
+
+        response = self.app.get('/tenders?feed=continuous&timeout=100')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'text/event-stream')
+        event = response.body.split('\n\n')[0].split('\n')
+        self.assertTrue(event[0].startswith('id: '))
+        self.assertEqual(json.loads(event[1][len('data: '):])['id'], tender['id'])
+
+        response = self.app.get('/tenders?feed=continuous&timeout=100', headers={'Last-Event-ID': event[0][len('id: '):]})
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.body, '')
+
+    def test_changes_follower_start(self):
+        db = self.db
+
+        class SlowInfo(object):
+            def info(self):
+                gevent.sleep(0.1)
+                return db.info()
+
+            def changes(self, **options):
+                return db.changes(**options)
+
+        follower = ChangesFollower(SlowInfo(), 1)
+        restarts = []
+        follower.listeners.append(lambda changes: changes is None and restarts.append(changes))
+        starts = [gevent.spawn(follower.start) for i in range(5)]
+        gevent.joinall(starts)
+        try:
+            self.assertEqual(set([i.value for i in starts]), set([db.info()['update_seq']]))
+            self.assertEqual(len(restarts), 1)
+            greenlet = follower.greenlet
+            follower.start()
+            self.assertIs(follower.greenlet, greenlet)
+        finally:
+            follower.greenlet.kill()
+
+    def test_single_flight_killed_leader(self):
+        flight = SingleFlight()
+        leader = gevent.spawn(flight, 'key', lambda: gevent.sleep(5))
+        gevent.sleep(0)
+        waiter = gevent.spawn(flight, 'key', lambda: 'value')
+        gevent.sleep(0)
+        leader.kill()
+        waiter.join(1)
+        self.assertTrue(waiter.ready())
+        self.assertEqual(flight.calls, {})
+        self.assertEqual(flight('key', lambda: 'value'), 'value')
+
+    def test_listing_cache(self):
+        registry = self.app.app.registry
+        follower = ChangesFollower(registry.db, 1)
+        registry.list_cache = ResponseCache(follower, 60)
+        registry.update_after = False
+        try:
+            response = self.app.get('/tenders')
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual(response.json['data'], [])
+            self.assertEqual(len(registry.list_cache.entries), 1)
+
+            seq = follower.seq
+            tender = self.create_tender()
+            response = self.app.get('/tenders')
+            self.assertEqual(response.json['data'], [])
+
+            self.assertTrue(follower.wait(seq, 5))
+            response = self.app.get('/tenders')
+            self.assertEqual([i['id'] for i in response.json['data']], [tender['id']])
+
+            response = self.app.get('/tenders?opt_jsonp=callback')
+            self.assertEqual(response.content_type, 'application/javascript')
+            self.assertIn('callback({', response.body)
+            self.assertIn(tender['id'], response.body)
+            self.assertEqual(len(registry.list_cache.entries), 1)
+        finally:
+            registry.list_cache = None
+            registry.update_after = True
+
+    def test_listing_cache_pages(self):
+        tenders = [self.create_tender() for i in range(2)]
+        while True:
+            response = self.app.get('/tenders')
+            self.assertEqual(response.status, '200 OK')
+            if len(response.json['data']) == 2:
+                break
+
+        registry = self.app.app.registry
+        # as with the default list_cache_ttl
+        registry.list_cache = ResponseCache(ChangesFollower(registry.db, 1), 1)
+        try:
+            response = self.app.get('/tenders?limit=1')
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[0]['id']])
+            self.assertEqual(len(registry.list_cache.entries), 1)
+
+            response = self.app.get(response.json['next_page']['path'].replace(ROUTE_PREFIX, ''))
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual(response.content_type, 'application/json')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[1]['id']])
+            self.assertEqual(len(registry.list_cache.entries), 1)
+
+            doc = self.db[tenders[0]['id']]
+            doc['documents'][0]['url'] = 'http://ds.op/api/0.0/tenders/{}/documents/{}?download=1'.format(doc.id, doc['documents'][0]['id'])
+            self.db.save(doc)
+            url = self.app.get('/tenders/{}'.format(doc.id)).json['data']['documents'][0]['url']
+            self.assertNotEqual(url, doc['documents'][0]['url'])
+            response = self.app.get('/tenders?opt_fields=documents&limit=1')
+            self.assertEqual(response.json['data'][0]['documents'][0]['url'], url)
+        finally:
+            registry.list_cache = None
+
+    def test_listing_stale_bounds(self):
+        registry = self.app.app.registry
+        registry.stale_bounds = {(u'dateModified', None): 60}
+        try:
+            self.create_tender()
+            while True:
+                response = self.app.get('/tenders')
+                self.assertEqual(response.status, '200 OK')
+                if len(response.json['data']) == 1:
+                    break
+            self.assertIn(u'tenders_compact', registry.index_lag.seqs)
+
+            registry.stale_bounds = {(u'dateModified', None): 60, (u'dateModified', u'test'): 0}
+            test_tender = deepcopy(self.initial_data)
+            test_tender['mode'] = u'test'
+            test_tender = self.create_tender(test_tender)
+            response = self.app.get('/tenders?mode=test')
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual([i['id'] for i in response.json['data']], [test_tender['id']])
+        finally:
+            registry.stale_bounds = {}
+
+    def test_offset_codec(self):
+        registry = self.app.app.registry
+        codec = registry.offset_codec
+        uuid, name = registry.couchdb_server.uuid, registry.db.name
+        # the last keys do not fit one cipher block and fall back to the api helpers
+        keys = [0, 1, 123456789, 'now', '2016-01-01T00:00', 'x' * 32, 'y' * 48]
+        encrypted = [encrypt(uuid, name, key) for key in keys]
+        self.assertEqual(codec.encrypt_many(keys), encrypted)
+        self.assertEqual(codec.encrypt_many(keys[:5]), encrypted[:5])
+        self.assertEqual([codec.encrypt(key) for key in keys], encrypted)
+        for key in encrypted + ['', '00', 'not hex', encrypted[0][:-2]]:
+            self.assertEqual(codec.decrypt(key), decrypt(uuid, name, key))
+        self.assertRaises(ValueError, encrypt, uuid, name, 'x' * 17)
+        self.assertRaises(ValueError, codec.encrypt, 'x' * 17)
+
+    def test_bulk_get(self):
+        tenders = [self.create_tender() for i in range(2)]
+        ids = [i['id'] for i in tenders]
+
+        response = self.app.post_json('/bulk_get/tenders', {'data': ids + ['some_id']})
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual([i['id'] for i in response.json['data']], ids)
+        self.assertEqual(response.json['data'][0]['tenderID'], tenders[0]['tenderID'])
+        self.assertNotIn('_rev', response.json['data'][0])
+        self.assertNotIn('doc_type', response.json['data'][0])
+        self.assertEqual(response.json['missing'], ['some_id'])
+
+        doc = self.db[ids[0]]
+        doc['documents'][0]['url'] = 'http://ds.op/api/0.0/tenders/{}/documents/{}?download=1'.format(doc.id, doc['documents'][0]['id'])
+        self.db.save(doc)
+        tender = self.app.get('/tenders/{}'.format(doc.id)).json['data']
+        self.assertNotEqual(tender['documents'][0]['url'], doc['documents'][0]['url'])
+        response = self.app.post_json('/bulk_get/tenders', {'data': ids[:1]})
+        self.assertEqual(response.json['data'], [tender])
+
+        response = self.app.post_json('/bulk_get/tenders', {'data': ids[0]}, status=422)
+        self.assertEqual(response.status, '422 Unprocessable Entity')
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'Expecting a list of ids', u'location': u'body', u'name': u'data'}
+        ])
+
+        response = self.app.post_json('/bulk_get/tenders', {'data': ids * 51}, status=422)
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'At most 100 ids are allowed', u'location': u'body', u'name': u'data'}
+        ])
+
     def test_get_tender(self):
         tender = self.create_tender()
 
@@ -304,6 +596,285 @@ class TenderResourceTest(TenderBaseWebTest):
         self.assertEqual(response.content_type, 'application/json')
         self.assertIn('{\n    "data": {\n        "', response.body)
 
+    def test_get_tender_opt_fields(self):
+        tender = self.create_tender()
+
+        response = self.app.get('/tenders/{}?opt_fields=status,/value/amount,/items/0/description'.format(tender['id']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data'], {
+            u'id': tender['id'],
+            u'status': tender['status'],
+            u'value': {u'amount': tender['value']['amount']},
+            u'items': [{u'description': tender['items'][0]['description']}],
+        })
+
+        response = self.app.get('/tenders/{}?opt_fields=title,/value/unknown'.format(tender['id']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data'], {u'id': tender['id'], u'title': tender['title']})
+
+        response = self.app.get('/tenders/{}/items?opt_fields=status'.format(tender['id']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data'], tender['items'])
+
+    def test_get_tender_since_rev(self):
+        tender = self.create_tender()
+        response = self.app.get('/tenders/{}'.format(tender['id']))
+        rev = response.etag
+        self.assertEqual(rev, self.db[tender['id']]['_rev'])
+
+        response = self.app.get('/tenders/{}?since_rev={}'.format(tender['id'], rev))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json, {u'patch': []})
+
+        old = self.db[tender['id']]
+        new = deepcopy(old)
+        new['status'] = u'complete'
+        self.db.save(new)
+        add_revision(self.db, old, new, 10)
+        response = self.app.get('/tenders/{}?since_rev={}'.format(tender['id'], rev))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.etag, new['_rev'])
+        self.assertEqual(response.json['patch'], [{u'op': u'replace', u'path': u'/status', u'value': u'complete'}])
+
+        self.db.delete(self.db[REVISIONS_ID.format(tender['id'])])
+        response = self.app.get('/tenders/{}?since_rev={}'.format(tender['id'], rev))
+        self.assertEqual(response.json['patch'], [{u'op': u'replace', u'path': u'/status', u'value': u'complete'}])
+
+        response = self.app.get('/tenders/{}?since_rev=1-{}'.format(tender['id'], uuid4().hex))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data']['status'], u'complete')
+
+    def test_lookup_tender(self):
+        tender = self.create_tender()
+
+        response = self.app.get('/lookup/tenders/{}'.format(tender['tenderID']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertDictEqual(response.json['data'], tender)
+        self.assertEqual(response.etag, self.db[tender['id']]['_rev'])
+
+        response = self.app.get('/lookup/tenders/{}?opt_fields=status'.format(tender['tenderID']))
+        self.assertEqual(response.json['data'], {u'id': tender['id'], u'status': tender['status']})
+
+        doc = self.db[tender['id']]
+        doc['tenderID'] = u'UA-Y'
+        self.db.save(doc)
+        response = self.app.get('/lookup/tenders/{}'.format(tender['tenderID']), status=404)
+        self.assertEqual(response.status, '404 Not Found')
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'Not Found', u'location': u'url', u'name': u'public_id'}
+        ])
+
+        response = self.app.get('/lookup/tenders/UA-Y')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data']['id'], tender['id'])
+
+    def test_search(self):
+        response = self.app.get('/search/tenders?q=paper', status=404)
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'Not Found', u'location': u'url', u'name': u'search'}
+        ])
+
+        data = deepcopy(self.initial_data)
+        data['title'] = u'Office paper and paper clips'
+        tenders = [self.create_tender(data)]
+        data['title'] = u'Office chairs'
+        data['description'] = u'Chairs for the paper archive'
+        tenders.append(self.create_tender(data))
+        self.create_tender()
+
+        path = mkdtemp()
+        registry = self.app.app.registry
+        registry.search_index = SearchIndex(self.db, os.path.join(path, 'search.db'))
+        try:
+            registry.search_index.rebuild()
+
+            response = self.app.get('/search/tenders?q=paper')
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual(response.json['data'], [{u'id': i['id'], u'dateModified': i['dateModified']} for i in tenders])
+
+            response = self.app.get('/search/tenders?q=office%20chairs&opt_fields=title')
+            self.assertEqual(response.json['data'], [{u'id': tenders[1]['id'], u'dateModified': tenders[1]['dateModified'], u'title': u'Office chairs'}])
+
+            response = self.app.get('/search/tenders?q=paper&limit=1&offset=1')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[1]['id']])
+
+            response = self.app.get('/search/tenders?q=', status=422)
+            self.assertEqual(response.json['errors'], [
+                {u'description': u'Expecting search words', u'location': u'params', u'name': u'q'}
+            ])
+
+            doc = self.db[tenders[0]['id']]
+            doc['title'] = u'Office desks'
+            self.db.save(doc)
+            conn = registry.search_index.connect()
+            registry.search_index.catch_up(conn)
+            conn.close()
+            response = self.app.get('/search/tenders?q=paper')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[1]['id']])
+
+            # a rebuild links the index to a new file, read from the next request on
+            registry.search_index.rebuild()
+            self.assertTrue(os.path.islink(os.path.join(path, 'search.db')))
+            response = self.app.get('/search/tenders?q=chairs')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[1]['id']])
+        finally:
+            registry.search_index = None
+            shutil.rmtree(path)
+
+    def test_stats(self):
+        tenders = [self.create_tender() for i in range(3)]
+        amount = sum([i['value']['amount'] for i in tenders])
+
+        response = self.app.get('/stats/tenders')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data'], [{
+            u'key': [u'active'], u'count': 3, u'sum': amount,
+            u'min': tenders[0]['value']['amount'], u'max': tenders[0]['value']['amount'],
+        }])
+        self.assertIn('_design/tenders_stats', self.db)
+
+        response = self.app.get('/stats/tenders?by=procurementMethodType&group_level=2')
+        self.assertEqual([(i['key'], i['count']) for i in response.json['data']],
+                         [([tenders[0].get('procurementMethodType'), u'active'], 3)])
+
+        response = self.app.get('/stats/tenders?by=month')
+        self.assertEqual([(i['key'], i['count']) for i in response.json['data']],
+                         [([tenders[0].get('date', tenders[0]['dateModified'])[:7]], 3)])
+
+        self.create_tender()
+        while True:
+            response = self.app.get('/stats/tenders')
+            self.assertEqual(response.status, '200 OK')
+            if response.json['data'][0]['count'] == 4:
+                break
+
+        response = self.app.get('/stats/tenders?by=value', status=422)
+        self.assertEqual(response.json['errors'], [
+            {u'description': u'Expecting one of: status, procurementMethodType, month', u'location': u'params', u'name': u'by'}
+        ])
+
+    def test_local_store(self):
+        tenders = [self.create_tender() for i in range(3)]
+        while True:
+            response = self.app.get('/tenders?feed=changes&opt_fields=status')
+            if len(response.json['data']) == 3:
+                break
+        lists = [self.app.get(i).json for i in ('/tenders?limit=2', '/tenders?feed=changes&opt_fields=status', '/tenders?opt_fields=title')]
+        tender = self.app.get('/tenders/{}'.format(tenders[1]['id'])).json
+
+        path = mkdtemp()
+        self.assertRaises(TypeError, ChangesIndex, self.db, os.path.join(path, 'index.db'))
+        registry = self.app.app.registry
+        store = registry.store
+        registry.store = SQLiteStore(self.db, os.path.join(path, 'store.db'), registry.changes_follower)
+        try:
+            registry.store.rebuild()
+            self.assertEqual([self.app.get(i).json for i in ('/tenders?limit=2', '/tenders?feed=changes&opt_fields=status', '/tenders?opt_fields=title')], lists)
+            self.assertEqual(self.app.get('/tenders/{}'.format(tenders[1]['id'])).json, tender)
+
+            response = self.app.get(lists[0]['next_page']['path'].replace(ROUTE_PREFIX, ''))
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[2]['id']])
+
+            # items come from the replica too, not from the items view
+            doc = self.db[tenders[0]['id']]
+            doc['documents'][0]['title'] = u'Changed title'
+            self.db.save(doc)
+            response = self.app.get('/tenders/{}/documents/{}'.format(doc.id, doc['documents'][0]['id']))
+            self.assertEqual(response.json['data']['title'], tenders[0]['documents'][0]['title'])
+
+            self.db.delete(self.db[tenders[1]['id']])
+            conn = registry.store.connect()
+            registry.store.catch_up(conn)
+            conn.close()
+            response = self.app.get('/tenders')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[0]['id'], tenders[2]['id']])
+            self.app.get('/tenders/{}'.format(tenders[1]['id']), status=404)
+
+            # a lagging replica is not read
+            seq = registry.changes_follower.start()
+            tender = self.create_tender()
+            self.assertTrue(registry.changes_follower.wait(seq, 5))
+            registry.store.max_lag = 0
+            response = self.app.get('/tenders/{}'.format(tender['id']))
+            self.assertEqual(response.json['data'], tender)
+            while True:
+                response = self.app.get('/tenders')
+                if len(response.json['data']) == 3:
+                    break
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[0]['id'], tenders[2]['id'], tender['id']])
+        finally:
+            registry.store = store
+            shutil.rmtree(path)
+
+    def test_feed_index(self):
+        tenders = [self.create_tender() for i in range(3)]
+        while True:
+            response = self.app.get('/tenders?feed=changes')
+            if len(response.json['data']) == 3:
+                break
+        urls = ('/tenders?feed=changes', '/tenders?feed=changes&limit=2', '/tenders?feed=changes&descending=1&limit=2')
+        lists = [self.app.get(i).json for i in urls]
+
+        path = mkdtemp()
+        registry = self.app.app.registry
+        registry.feed_index = FeedIndex(self.db, os.path.join(path, 'feeds'), ['Tender'], registry.changes_follower)
+        try:
+            registry.feed_index.open()
+            registry.feed_index.catch_up()
+            self.assertEqual([self.app.get(i).json for i in urls], lists)
+
+            response = self.app.get(lists[1]['next_page']['path'].replace(ROUTE_PREFIX, ''))
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[2]['id']])
+
+            doc = self.db[tenders[0]['id']]
+            doc['dateModified'] = get_now().isoformat()
+            self.db.save(doc)
+            registry.feed_index.catch_up()
+            response = self.app.get('/tenders?feed=changes')
+            self.assertEqual([i['id'] for i in response.json['data']], [tenders[1]['id'], tenders[2]['id'], tenders[0]['id']])
+            self.assertEqual(response.json['data'][2]['dateModified'], doc['dateModified'])
+
+            feed_file = registry.feed_index.files[('Tender', u'')]
+            self.assertEqual((feed_file.count, feed_file.dead), (4, 1))
+            registry.feed_index.compact(('Tender', u''))
+            self.assertEqual((feed_file.count, feed_file.dead), (3, 0))
+            self.assertEqual(self.app.get('/tenders?feed=changes').json, response.json)
+        finally:
+            registry.feed_index = None
+            shutil.rmtree(path)
+
+    def test_doc_cache(self):
+        tender = self.create_tender()
+        registry = self.app.app.registry
+        registry.doc_cache = DocumentCache(LRUCache(10), registry.changes_follower, 'tests')
+        try:
+            response = self.app.get('/tenders/{}'.format(tender['id']))
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual(response.json['data'], tender)
+            doc = self.db[tender['id']]
+            self.assertIn('tests:doc:{}:{}'.format(tender['id'], doc.rev), registry.doc_cache.backend)
+
+            doc['title'] = u'Changed title'
+            self.db.save(doc)
+            response = self.app.get('/tenders/{}'.format(tender['id']))
+            self.assertEqual(response.json['data']['title'], tender['title'])
+
+            registry.doc_cache.invalidate([{'id': tender['id']}])
+            response = self.app.get('/tenders/{}'.format(tender['id']))
+            self.assertEqual(response.json['data']['title'], u'Changed title')
+            self.assertEqual(response.etag, doc.rev)
+
+            # a restarted follower drops current revisions of every cache sharing the backend
+            doc['title'] = u'Changed again'
+            self.db.save(doc)
+            DocumentCache(registry.doc_cache.backend, ChangesFollower(self.db), 'tests').invalidate(None)
+            response = self.app.get('/tenders/{}'.format(tender['id']))
+            self.assertEqual(response.json['data']['title'], u'Changed again')
+        finally:
+            registry.changes_follower.listeners.remove(registry.doc_cache.invalidate)
+            registry.doc_cache = None
+
     def test_tender_not_found(self):
         response = self.app.get('/tenders')
         self.assertEqual(response.status, '200 OK')
@@ -412,6 +983,27 @@ class TenderAwardResourceTest(TenderBaseWebTest):
         self.assertEqual(response.content_type, 'application/json')
         self.assertIn('{\n    "data": {\n        "', response.body)
 
+    def test_get_award_after_update(self):
+        tender = self.create_tender()
+
+        response = self.app.get('/tenders/{}/awards/{}'.format(tender['id'], tender['awards'][0]['id']))
+        self.assertEqual(response.status, '200 OK')
+
+        data = self.db[tender['id']]
+        award = deepcopy(test_award)
+        award['date'] = get_now().isoformat()
+        award['id'] = uuid4().hex
+        data['awards'].insert(0, award)
+        self.db.save(data)
+
+        response = self.app.get('/tenders/{}/awards/{}'.format(tender['id'], award['id']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.json['data']['id'], award['id'])
+
+        response = self.app.get('/tenders/{}/awards/{}'.format(tender['id'], tender['awards'][0]['id']))
+        self.assertEqual(response.status, '200 OK')
+        self.assertDictEqual(response.json['data'], tender['awards'][0])
+
     def test_award_not_found(self):
         tender = self.create_tender()
 
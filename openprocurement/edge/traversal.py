@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from munch import Munch
+from openprocurement.edge.design import ITEM_COLLECTIONS, ITEMS_VIEW
 from pyramid.security import (
     ALL_PERMISSIONS,
     Allow,
@@ -18,97 +20,152 @@ class Root(object):
         self.db = request.registry.db
 
 
+class Document(Munch):
+    """Per-request overlay over a fetched document.
+
+    Top-level values are shared with the fetched document, which is left
+    untouched, so that one converted copy of a revision is read by
+    concurrent requests. ``__parent__`` and ``rev`` are attributes and
+    never become keys.
+    """
+    __parent__ = None
+    rev = None
+
+    def __init__(self, doc, parent):
+        super(Document, self).__init__((k, v) for k, v in doc.iteritems() if k not in ('_id', '_rev', 'doc_type'))
+        self.__parent__ = parent
+        self.rev = doc.get('_rev')
+
+
+class ItemIndex(object):
+    """Positions of list items by id, built lazily per collection path.
+
+    A collection path is the tuple of keys and list positions leading to
+    the list, e.g. ``('bids', 2, 'documents')``.
+    """
+
+    def __init__(self):
+        self._collections = {}
+        self._documents = {}
+
+    def positions(self, path, items, item_id):
+        collection = self._collections.get(path)
+        if collection is None:
+            collection = self._collections[path] = {}
+            for position, i in enumerate(items):
+                if isinstance(i, dict):
+                    collection.setdefault(i.get('id'), []).append(position)
+        return collection.get(item_id, [])
+
+    def document(self, path, documents, document_id):
+        """Latest version of the document with its ``previousVersions``."""
+        key = (path, document_id)
+        document = self._documents.get(key)
+        if document is None:
+            versions = [documents[i] for i in self.positions(path, documents, document_id)]
+            document = self._documents[key] = add_previous_versions(versions)
+        return document
+
+
+def get_item_index(request, data):
+    rev = getattr(data, 'rev', None)
+    if rev is None:
+        return ItemIndex()
+    cache = request.registry.item_index_cache
+    key = (data.get('id'), rev)
+    index = cache.get(key)
+    if index is None:
+        index = ItemIndex()
+        cache.set(key, index)
+    return index
+
+
+def add_previous_versions(documents):
+    """Copy of the last of ``documents`` with the others as previous versions."""
+    document = documents[-1]
+    versions = [{'url':i['url'], 'dateModified':i['dateModified']} for i in documents[:-1] if i['url'] != document['url']]
+    return type(document)(document, previousVersions=versions)
+
+
+def get_view_item(request, doc_type, doc_id):
+    """Fetch ``/{collection}/{item_id}`` fragment of a document from the items view.
+
+    Returns ``None`` when the path is not served by the view or nothing was
+    found, so that the caller falls back to the full document traversal.
+    Documents read from a local store or a document cache are not read
+    from CouchDB for their items either.
+    """
+    registry = request.registry
+    if not registry.item_views or registry.store.local or registry.doc_cache is not None:
+        return
+    items = request.matchdict.get('items')
+    if not items or len(items) != 2 or items[0] not in ITEM_COLLECTIONS:
+        return
+    key = [doc_type, doc_id] + list(items)
+    rows = [i.value for i in ITEMS_VIEW(registry.db, startkey=key, endkey=key + [{}])]
+    if not rows:
+        return
+    if len(rows) > 1 and items[0] == 'documents':
+        return add_previous_versions(rows)
+    return rows[0]
+
+
 def get_item(request, data):
     item = []
     if request.matchdict.get('items'):
+        index = get_item_index(request, data)
         item = data
-        for index, item_name in enumerate(request.matchdict['items']):
+        path = ()
+        for n, item_name in enumerate(request.matchdict['items']):
             if isinstance(item, dict):
                 item = item.get(item_name, [])
+                path += (item_name,)
             elif isinstance(item, list):
-                items = [i for i in item if i['id'] == item_name]
-                if len(items) > 1 and request.matchdict['items'][index - 1] == 'documents':
-                    document = items.pop()
-                    document['previousVersions'] = [{'url':i['url'], 'dateModified':i['dateModified']} for i in items if i.url != document.url]
-                    items[0] = document
-                if not items:
+                positions = index.positions(path, item, item_name)
+                if not positions:
                     from openprocurement.api.utils import error_handler
-                    request.errors.add('url', '{}_id'.format(request.matchdict['items'][index - 1][:-1]), 'Not Found')
+                    request.errors.add('url', '{}_id'.format(request.matchdict['items'][n - 1][:-1]), 'Not Found')
                     request.errors.status = 404
                     raise error_handler(request.errors)
+                if len(positions) > 1 and request.matchdict['items'][n - 1] == 'documents':
+                    item = index.document(path, item, item_name)
+                    path += (positions[-1],)
                 else:
-                    item = items[0]
+                    item = item[positions[0]]
+                    path += (positions[0],)
     return item
 
 
-
-def tender_factory(request):
-    request.validated['tender_src'] = {}
+def document_factory(request, name, doc_type):
+    request.validated['{}_src'.format(name)] = {}
     root = Root(request)
-    if not request.matchdict or not request.matchdict.get('tender_id'):
+    if not request.matchdict or not request.matchdict.get('{}_id'.format(name)):
+        return root
+    doc_id = request.validated['{}_id'.format(name)] = request.matchdict['{}_id'.format(name)]
+    item = get_view_item(request, doc_type, doc_id)
+    if item is not None:
+        request.validated['item'] = item
+        request.validated['id'] = doc_id
         return root
-    request.validated['tender_id'] = request.matchdict['tender_id']
-    tender = request.tender
-    del tender._id
-    del tender.doc_type
-    tender.__parent__ = root
-    request.validated['tender'] = request.validated['db_doc'] = tender
-    request.validated['tender'].rev = tender.pop('_rev')
-    request.validated['tender_status'] = tender.status
-    request.validated['item'] = get_item(request, tender)
-    request.validated['id'] = request.matchdict['tender_id']
-    return tender
+    doc = Document(getattr(request, name), root)
+    request.validated[name] = request.validated['db_doc'] = doc
+    request.validated['{}_status'.format(name)] = doc.get('status')
+    request.validated['item'] = get_item(request, doc)
+    request.validated['id'] = doc_id
+    return doc
+
+
+def tender_factory(request):
+    return document_factory(request, 'tender', 'Tender')
 
 
 def auction_factory(request):
-    request.validated['auction_src'] = {}
-    root = Root(request)
-    if not request.matchdict or not request.matchdict.get('auction_id'):
-        return root
-    request.validated['auction_id'] = request.matchdict['auction_id']
-    auction = request.auction
-    del auction._id
-    del auction.doc_type
-    auction.__parent__ = root
-    request.validated['auction'] = request.validated['db_doc'] = auction
-    request.validated['auction'].rev = auction.pop('_rev')
-    request.validated['auction_status'] = auction.status
-    request.validated['item'] = get_item(request, auction)
-    request.validated['id'] = request.matchdict['auction_id']
-    return auction
+    return document_factory(request, 'auction', 'Auction')
 
 
 def contract_factory(request):
-    request.validated['contract_src'] = {}
-    root = Root(request)
-    if not request.matchdict or not request.matchdict.get('contract_id'):
-        return root
-    request.validated['contract_id'] = request.matchdict['contract_id']
-    contract = request.contract
-    del contract._id
-    del contract.doc_type
-    contract.__parent__ = root
-    request.validated['contract'] = request.validated['db_doc'] = contract
-    request.validated['contract'].rev = contract.pop('_rev')
-    request.validated['contract_status'] = contract.status
-    request.validated['item'] = get_item(request, contract)
-    request.validated['id'] = request.matchdict['contract_id']
-    return contract
+    return document_factory(request, 'contract', 'Contract')
 
 
 def plan_factory(request):
-    request.validated['plan_src'] = {}
-    root = Root(request)
-    if not request.matchdict or not request.matchdict.get('plan_id'):
-        return root
-    request.validated['plan_id'] = request.matchdict['plan_id']
-    plan = request.plan
-    del plan._id
-    del plan.doc_type
-    plan.__parent__ = root
-    request.validated['plan'] = request.validated['db_doc'] = plan
-    request.validated['plan'].rev = plan.pop('_rev')
-    request.validated['plan_status'] = plan.status
-    request.validated['item'] = get_item(request, plan)
-    request.validated['id'] = request.matchdict['plan_id']
-    return plan
+    return document_factory(request, 'plan', 'Plan')
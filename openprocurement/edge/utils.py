@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
+from binascii import hexlify, unhexlify
+from Crypto.Cipher import AES
+from Crypto.Util.strxor import strxor
 from cornice.resource import resource
 from functools import partial
+from openprocurement.edge.design import public_ids_view
+from openprocurement.edge.revisions import public_doc
 from openprocurement.edge.traversal import tender_factory, auction_factory, contract_factory, plan_factory
 from pyramid.exceptions import URLDecodeError
 from pyramid.compat import decode_path_info
 from munch import munchify
-from openprocurement.api.utils import error_handler
+from openprocurement.api.utils import error_handler, encrypt, decrypt
 
 opresource = partial(resource, error_handler=error_handler, factory=tender_factory)
 eaopresource = partial(resource, error_handler=error_handler, factory=auction_factory)
@@ -13,14 +18,148 @@ contractingresource = partial(resource, error_handler=error_handler, factory=con
 planningresource = partial(resource, error_handler=error_handler, factory=plan_factory)
 
 
+class OffsetCodec(object):
+    """``encrypt``/``decrypt`` of changes offsets for one server and database.
+
+    Output is the same as of ``openprocurement.api.utils``, but the cipher
+    is set up once: a single block CBC encryption is an ECB encryption of
+    the block xor-ed with the iv, so offsets fitting one block are coded
+    with a shared ECB cipher, several of them in one call.
+    """
+
+    def __init__(self, uuid, name):
+        self.uuid = uuid
+        self.name = name
+        self.iv = "{:^{}.{}}".format(name, AES.block_size, AES.block_size)
+        self.cipher = AES.new(uuid, AES.MODE_ECB)
+
+    def encrypt_many(self, keys):
+        texts = ["{:^{}}".format(key, AES.block_size) for key in keys]
+        if any(len(text) != AES.block_size for text in texts):
+            return [encrypt(self.uuid, self.name, key) for key in keys]
+        data = hexlify(self.cipher.encrypt(''.join(strxor(text, self.iv) for text in texts)))
+        size = 2 * AES.block_size
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def encrypt(self, key):
+        return self.encrypt_many([key])[0]
+
+    def decrypt(self, key):
+        try:
+            data = unhexlify(key)
+        except (TypeError, UnicodeEncodeError):
+            return ''
+        if len(data) != AES.block_size:
+            return decrypt(self.uuid, self.name, key)
+        return strxor(self.cipher.decrypt(data), self.iv).strip()
+
+
+class Selection(dict):
+    """Partly selected object; integer keys are positions in a list."""
+
+    def value(self):
+        if self and all(isinstance(i, int) for i in self):
+            return [select_value(self[i]) for i in sorted(self)]
+        return dict([(k, select_value(v)) for k, v in self.items()])
+
+
+def select_value(value):
+    return value.value() if isinstance(value, Selection) else value
+
+
+def project(doc, fields):
+    """Part of ``doc`` with the given fields.
+
+    A field is a top-level key or a JSON pointer (``/value/amount``,
+    ``/items/0/description``); selections inside lists keep only the
+    selected positions. Fields not present are skipped.
+    """
+    selection = Selection()
+    for field in fields:
+        path, value = [], doc
+        for part in field.split('/')[1:] if field.startswith('/') else [field]:
+            part = part.replace('~1', '/').replace('~0', '~')
+            if isinstance(value, list) and part.isdigit() and int(part) < len(value):
+                part = int(part)
+            elif not isinstance(value, dict) or part not in value:
+                break
+            path.append(part)
+            value = value[part]
+        else:
+            node = selection
+            for part in path[:-1]:
+                node = node.setdefault(part, Selection())
+                if not isinstance(node, Selection):
+                    break
+            else:
+                node[path[-1]] = value
+    return selection.value()
+
+
+def fetch_doc(registry, doc_id):
+    """Document from the shared document cache, if there is one, or from the store."""
+    if registry.doc_cache is not None:
+        return registry.doc_cache.get(doc_id, registry.store.get)
+    return registry.store.get(doc_id)
+
+
+def shared_doc(registry, doc):
+    """``doc`` converted once per revision and shared by the requests reading it.
+
+    Requests overlay it with a ``Document`` and never modify it.
+    """
+    key = (doc['_id'], doc.get('_rev'))
+    shared = registry.munch_cache.get(key)
+    if shared is None:
+        shared = munchify(doc)
+        if key[1] is not None:
+            registry.munch_cache.set(key, shared)
+    return shared
+
+
 def extract_doc_adapter(request, doc_id, doc_type):
-    db = request.registry.db
-    doc = db.get(doc_id)
+    # concurrent requests for one document share a single fetch
+    doc = request.registry.document_flight(doc_id, lambda: fetch_doc(request.registry, doc_id))
     if doc is None or doc.get('doc_type') != doc_type:
         request.errors.add('url', '{}_id'.format(doc_type.lower()), 'Not Found')
         request.errors.status = 404
         raise error_handler(request.errors)
-    return munchify(doc)
+    fields = request.params.get('opt_fields')
+    if fields and not (request.matchdict or {}).get('items'):
+        return munchify(project(doc, fields.split(',') + ['id', '_id', '_rev', 'doc_type']))
+    return shared_doc(request.registry, doc)
+
+
+def lookup_doc(request, doc_type, public_id):
+    """Document of ``doc_type`` with the given public id (``tenderID``, ``planID``, ...).
+
+    The ``_id`` found is cached per worker and checked against the
+    fetched document on later lookups.
+    """
+    db = request.registry.db
+    cache = request.registry.public_id_cache
+    key = (doc_type, public_id)
+    doc_id = cache.get(key)
+    doc = None
+    if doc_id is not None:
+        doc = request.registry.document_flight(doc_id, lambda: fetch_doc(request.registry, doc_id))
+        if doc is None or doc.get('doc_type') != doc_type or doc.get('{}ID'.format(doc_type.lower())) != public_id:
+            cache.delete(key)
+            doc = None
+    if doc is None:
+        docs = [row.doc for row in public_ids_view(db, key=[doc_type, public_id], include_docs=True) if row.doc]
+        if docs:
+            doc = max(docs, key=lambda i: i.get('dateModified'))
+            cache.set(key, doc['_id'])
+    if doc is None:
+        request.errors.add('url', 'public_id', 'Not Found')
+        request.errors.status = 404
+        raise error_handler(request.errors)
+    request.response.etag = doc['_rev']
+    fields = request.params.get('opt_fields')
+    if fields:
+        doc = project(doc, fields.split(',') + ['id'])
+    return munchify(public_doc(doc))
 
 
 def extract_doc(request, doc_type):
@@ -1,15 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from functools import partial
-from openprocurement.api.models import get_now
 from openprocurement.api.utils import (
-    context_unpack,
-    decrypt,
-    encrypt,
     json_view,
     APIResource,
 )
-from openprocurement.edge.utils import eaopresource
+from openprocurement.edge.listing import Listing
+from openprocurement.edge.revisions import document_data
+from openprocurement.edge.utils import eaopresource, lookup_doc
 
 try:
     import openprocurement.auctions.core as auctions_core
@@ -40,6 +37,7 @@ if auctions_core:
         u'dateModified': VIEW_MAP,
         u'changes': CHANGES_VIEW_MAP,
     }
+    LISTING = Listing('Auctions', 'auction', FEED, FIELDS)
 
 
 @eaopresource(name='Auctions',
@@ -47,11 +45,6 @@ if auctions_core:
             description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#auction for more info")
 class AuctionsResource(APIResource):
 
-    def __init__(self, request, context):
-        super(AuctionsResource, self).__init__(request, context)
-        self.server = request.registry.couchdb_server
-        self.update_after = request.registry.update_after
-
     @json_view(permission='view_auction')
     def get(self):
         """Auctions List
@@ -84,111 +77,79 @@ class AuctionsResource(APIResource):
             }
 
         """
-        # http://wiki.apache.org/couchdb/HTTP_view_API#Querying_Options
-        params = {}
-        pparams = {}
-        fields = self.request.params.get('opt_fields', '')
-        if fields:
-            params['opt_fields'] = fields
-            pparams['opt_fields'] = fields
-            fields = fields.split(',')
-            view_fields = fields + ['dateModified', 'id']
-        limit = self.request.params.get('limit', '')
-        if limit:
-            params['limit'] = limit
-            pparams['limit'] = limit
-        limit = int(limit) if limit.isdigit() and (100 if fields else 1000) >= int(limit) > 0 else 100
-        descending = bool(self.request.params.get('descending'))
-        offset = self.request.params.get('offset', '')
-        if descending:
-            params['descending'] = 1
-        else:
-            pparams['descending'] = 1
-        feed = self.request.params.get('feed', '')
-        view_map = FEED.get(feed, VIEW_MAP)
-        changes = view_map is CHANGES_VIEW_MAP
-        if feed and feed in FEED:
-            params['feed'] = feed
-            pparams['feed'] = feed
-        mode = self.request.params.get('mode', '')
-        if mode and mode in view_map:
-            params['mode'] = mode
-            pparams['mode'] = mode
-        view_limit = limit + 1 if offset else limit
-        if changes:
-            if offset:
-                view_offset = decrypt(self.server.uuid, self.db.name, offset)
-                if view_offset and view_offset.isdigit():
-                    view_offset = int(view_offset)
-                else:
-                    self.request.errors.add('params', 'offset', 'Offset expired/invalid')
-                    self.request.errors.status = 404
-                    return
-            if not offset:
-                view_offset = 'now' if descending else 0
-        else:
-            if offset:
-                view_offset = offset
-            else:
-                view_offset = '9' if descending else ''
-        list_view = view_map.get(mode, view_map[u''])
-        if self.update_after:
-            view = partial(list_view, self.db, limit=view_limit, startkey=view_offset, descending=descending, stale='update_after')
-        else:
-            view = partial(list_view, self.db, limit=view_limit, startkey=view_offset, descending=descending)
-        if fields:
-            if not changes and set(fields).issubset(set(FIELDS)):
-                results = [
-                    (dict([(i, j) for i, j in x.value.items() + [('id', x.id), ('dateModified', x.key)] if i in view_fields]), x.key)
-                    for x in view()
-                ]
-            elif changes and set(fields).issubset(set(FIELDS)):
-                results = [
-                    (dict([(i, j) for i, j in x.value.items() + [('id', x.id)] if i in view_fields]), x.key)
-                    for x in view()
-                ]
-            elif fields:
-                self.LOGGER.info('Used custom fields for auctions list: {}'.format(','.join(sorted(fields))),
-                            extra=context_unpack(self.request, {'MESSAGE_ID': 'auction_list_custom'}))
+        return LISTING(self)
 
-                results = [
-                    (dict([(k, j) for k, j in i[u'doc'].items() if k in view_fields]), i.key)
-                    for i in view(include_docs=True)
-                ]
-        else:
-            results = [
-                ({'id': i.id, 'dateModified': i.value['dateModified']} if changes else {'id': i.id, 'dateModified': i.key}, i.key)
-                for i in view()
-            ]
-        if results:
-            params['offset'], pparams['offset'] = results[-1][1], results[0][1]
-            if offset and view_offset == results[0][1]:
-                results = results[1:]
-            elif offset and view_offset != results[0][1]:
-                results = results[:limit]
-                params['offset'], pparams['offset'] = results[-1][1], view_offset
-            results = [i[0] for i in results]
-            if changes:
-                params['offset'] = encrypt(self.server.uuid, self.db.name, params['offset'])
-                pparams['offset'] = encrypt(self.server.uuid, self.db.name, pparams['offset'])
-        else:
-            params['offset'] = offset
-            pparams['offset'] = offset
-        data = {
-            'data': results,
-            'next_page': {
-                "offset": params['offset'],
-                "path": self.request.route_path('Auctions', _query=params),
-                "uri": self.request.route_url('Auctions', _query=params)
-            }
-        }
-        if descending or offset:
-            data['prev_page'] = {
-                "offset": pparams['offset'],
-                "path": self.request.route_path('Auctions', _query=pparams),
-                "uri": self.request.route_url('Auctions', _query=pparams)
-            }
-        return data
+
+@eaopresource(name='Auctions Feed',
+            path='/feed/auctions',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#auction for more info")
+class AuctionsFeedResource(APIResource):
+
+    @json_view(permission='view_auction')
+    def get(self):
+        """Auctions Feed
+
+        Whole changes feed as newline-delimited JSON for authenticated
+        mirrors, resumable with the last ``checkpoint`` passed as ``since``.
+        """
+        return LISTING.feed(self)
+
+
+@eaopresource(name='Auctions Bulk Get',
+            path='/bulk_get/auctions',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#auction for more info")
+class AuctionsBulkGetResource(APIResource):
+
+    @json_view(permission='view_auction')
+    def post(self):
+        """Auctions Bulk Get
+
+        Documents with the ids posted as ``{"data": [id, ...]}``, at most
+        ``bulk_get_limit`` of them; ids not found are listed in ``missing``.
+        """
+        return LISTING.bulk_get(self)
+
+
+@eaopresource(name='Auctions Search',
+            path='/search/auctions',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#auction for more info")
+class AuctionsSearchResource(APIResource):
+
+    @json_view(permission='view_auction')
+    def get(self):
+        """Auctions Search
+
+        Auctions with every word of ``q`` in their titles, descriptions, items
+        or procuring entity, best ranked first.
+        """
+        return LISTING.search(self)
+
+
+@eaopresource(name='Auctions Stats',
+            path='/stats/auctions',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#auction for more info")
+class AuctionsStatsResource(APIResource):
+
+    @json_view(permission='view_auction')
+    def get(self):
+        """Auctions Stats
+
+        Count and ``value.amount`` sum, min and max of auctions grouped by
+        ``by`` (status, procurementMethodType or month) and, with
+        ``group_level``, by the other dimensions as well.
+        """
+        return LISTING.statistics(self)
+
+
+@eaopresource(name='Auction Lookup',
+            path='/lookup/auctions/{public_id}',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#auction for more info")
+class AuctionLookupResource(APIResource):
+
+    @json_view(permission='view_auction')
+    def get(self):
+        """Auction by auctionID"""
+        return {'data': lookup_doc(self.request, 'Auction', self.request.matchdict['public_id'])}
 
 
 @eaopresource(name='Auction',
@@ -198,9 +159,7 @@ class AuctionResource(APIResource):
 
         @json_view(permission='view_auction')
         def get(self):
-            del self.request.validated['auction'].__parent__
-            del self.request.validated['auction'].rev
-            return {'data': self.request.validated['auction']}
+            return document_data(self.request, 'auction')
 
 
 @eaopresource(name='Auction Items',
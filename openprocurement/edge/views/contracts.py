@@ -1,14 +1,11 @@
 # -*- coding: utf-8 -*-
-from functools import partial
 from openprocurement.api.utils import (
-    context_unpack,
-    decrypt,
-    encrypt,
     json_view,
-
     APIResource,
 )
-from openprocurement.edge.utils import contractingresource
+from openprocurement.edge.listing import Listing
+from openprocurement.edge.revisions import document_data
+from openprocurement.edge.utils import contractingresource, lookup_doc
 
 try:
     import openprocurement.contracting.api as contracting
@@ -42,6 +39,7 @@ if contracting:
         u'dateModified': VIEW_MAP,
         u'changes': CHANGES_VIEW_MAP,
     }
+    LISTING = Listing('Contracts', 'contract', FEED, FIELDS)
 
 
 @contractingresource(name='Contracts',
@@ -49,11 +47,6 @@ if contracting:
             description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#contract for more info")
 class ContractsResource(APIResource):
 
-    def __init__(self, request, context):
-        super(ContractsResource, self).__init__(request, context)
-        self.server = request.registry.couchdb_server
-        self.update_after = request.registry.update_after
-
     @json_view(permission='view_contract')
     def get(self):
         """Contracts List
@@ -86,111 +79,79 @@ class ContractsResource(APIResource):
             }
 
         """
-        # http://wiki.apache.org/couchdb/HTTP_view_API#Querying_Options
-        params = {}
-        pparams = {}
-        fields = self.request.params.get('opt_fields', '')
-        if fields:
-            params['opt_fields'] = fields
-            pparams['opt_fields'] = fields
-            fields = fields.split(',')
-            view_fields = fields + ['dateModified', 'id']
-        limit = self.request.params.get('limit', '')
-        if limit:
-            params['limit'] = limit
-            pparams['limit'] = limit
-        limit = int(limit) if limit.isdigit() and (100 if fields else 1000) >= int(limit) > 0 else 100
-        descending = bool(self.request.params.get('descending'))
-        offset = self.request.params.get('offset', '')
-        if descending:
-            params['descending'] = 1
-        else:
-            pparams['descending'] = 1
-        feed = self.request.params.get('feed', '')
-        view_map = FEED.get(feed, VIEW_MAP)
-        changes = view_map is CHANGES_VIEW_MAP
-        if feed and feed in FEED:
-            params['feed'] = feed
-            pparams['feed'] = feed
-        mode = self.request.params.get('mode', '')
-        if mode and mode in view_map:
-            params['mode'] = mode
-            pparams['mode'] = mode
-        view_limit = limit + 1 if offset else limit
-        if changes:
-            if offset:
-                view_offset = decrypt(self.server.uuid, self.db.name, offset)
-                if view_offset and view_offset.isdigit():
-                    view_offset = int(view_offset)
-                else:
-                    self.request.errors.add('params', 'offset', 'Offset expired/invalid')
-                    self.request.errors.status = 404
-                    return
-            if not offset:
-                view_offset = 'now' if descending else 0
-        else:
-            if offset:
-                view_offset = offset
-            else:
-                view_offset = '9' if descending else ''
-        list_view = view_map.get(mode, view_map[u''])
-        if self.update_after:
-            view = partial(list_view, self.db, limit=view_limit, startkey=view_offset, descending=descending, stale='update_after')
-        else:
-            view = partial(list_view, self.db, limit=view_limit, startkey=view_offset, descending=descending)
-        if fields:
-            if not changes and set(fields).issubset(set(FIELDS)):
-                results = [
-                    (dict([(i, j) for i, j in x.value.items() + [('id', x.id), ('dateModified', x.key)] if i in view_fields]), x.key)
-                    for x in view()
-                ]
-            elif changes and set(fields).issubset(set(FIELDS)):
-                results = [
-                    (dict([(i, j) for i, j in x.value.items() + [('id', x.id)] if i in view_fields]), x.key)
-                    for x in view()
-                ]
-            elif fields:
-                self.LOGGER.info('Used custom fields for contracts list: {}'.format(','.join(sorted(fields))),
-                            extra=context_unpack(self.request, {'MESSAGE_ID': 'contract_list_custom'}))
+        return LISTING(self)
 
-                results = [
-                    (dict([(k, j) for k, j in i[u'doc'].items() if k in view_fields]), i.key)
-                    for i in view(include_docs=True)
-                ]
-        else:
-            results = [
-                ({'id': i.id, 'dateModified': i.value['dateModified']} if changes else {'id': i.id, 'dateModified': i.key}, i.key)
-                for i in view()
-            ]
-        if results:
-            params['offset'], pparams['offset'] = results[-1][1], results[0][1]
-            if offset and view_offset == results[0][1]:
-                results = results[1:]
-            elif offset and view_offset != results[0][1]:
-                results = results[:limit]
-                params['offset'], pparams['offset'] = results[-1][1], view_offset
-            results = [i[0] for i in results]
-            if changes:
-                params['offset'] = encrypt(self.server.uuid, self.db.name, params['offset'])
-                pparams['offset'] = encrypt(self.server.uuid, self.db.name, pparams['offset'])
-        else:
-            params['offset'] = offset
-            pparams['offset'] = offset
-        data = {
-            'data': results,
-            'next_page': {
-                "offset": params['offset'],
-                "path": self.request.route_path('Contracts', _query=params),
-                "uri": self.request.route_url('Contracts', _query=params)
-            }
-        }
-        if descending or offset:
-            data['prev_page'] = {
-                "offset": pparams['offset'],
-                "path": self.request.route_path('Contracts', _query=pparams),
-                "uri": self.request.route_url('Contracts', _query=pparams)
-            }
-        return data
+
+@contractingresource(name='Contracts Feed',
+            path='/feed/contracts',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#contract for more info")
+class ContractsFeedResource(APIResource):
+
+    @json_view(permission='view_contract')
+    def get(self):
+        """Contracts Feed
+
+        Whole changes feed as newline-delimited JSON for authenticated
+        mirrors, resumable with the last ``checkpoint`` passed as ``since``.
+        """
+        return LISTING.feed(self)
+
+
+@contractingresource(name='Contracts Bulk Get',
+            path='/bulk_get/contracts',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#contract for more info")
+class ContractsBulkGetResource(APIResource):
+
+    @json_view(permission='view_contract')
+    def post(self):
+        """Contracts Bulk Get
+
+        Documents with the ids posted as ``{"data": [id, ...]}``, at most
+        ``bulk_get_limit`` of them; ids not found are listed in ``missing``.
+        """
+        return LISTING.bulk_get(self)
+
+
+@contractingresource(name='Contracts Search',
+            path='/search/contracts',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#contract for more info")
+class ContractsSearchResource(APIResource):
+
+    @json_view(permission='view_contract')
+    def get(self):
+        """Contracts Search
+
+        Contracts with every word of ``q`` in their titles, descriptions, items
+        or procuring entity, best ranked first.
+        """
+        return LISTING.search(self)
+
+
+@contractingresource(name='Contracts Stats',
+            path='/stats/contracts',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#contract for more info")
+class ContractsStatsResource(APIResource):
+
+    @json_view(permission='view_contract')
+    def get(self):
+        """Contracts Stats
+
+        Count and ``value.amount`` sum, min and max of contracts grouped by
+        ``by`` (status, procurementMethodType or month) and, with
+        ``group_level``, by the other dimensions as well.
+        """
+        return LISTING.statistics(self)
+
+
+@contractingresource(name='Contract Lookup',
+            path='/lookup/contracts/{public_id}',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#contract for more info")
+class ContractLookupResource(APIResource):
+
+    @json_view(permission='view_contract')
+    def get(self):
+        """Contract by contractID"""
+        return {'data': lookup_doc(self.request, 'Contract', self.request.matchdict['public_id'])}
 
 
 @contractingresource(name='Contract',
@@ -200,9 +161,7 @@ class ContractResource(APIResource):
 
     @json_view(permission='view_contract')
     def get(self):
-        del self.request.validated['contract'].__parent__
-        del self.request.validated['contract'].rev
-        return {'data': self.request.validated['contract']}
+        return document_data(self.request, 'contract')
 
 
 @contractingresource(name='Contract Items',
@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-from functools import partial
 from openprocurement.api.design import (
     FIELDS,
     tenders_by_dateModified_view,
@@ -11,14 +10,12 @@ from openprocurement.api.design import (
 )
 
 from openprocurement.api.utils import (
-    context_unpack,
-    decrypt,
-    encrypt,
     json_view,
-    tender_serialize,
     APIResource,
 )
-from openprocurement.edge.utils import opresource
+from openprocurement.edge.listing import Listing
+from openprocurement.edge.revisions import document_data
+from openprocurement.edge.utils import opresource, lookup_doc
 
 
 VIEW_MAP = {
@@ -35,6 +32,7 @@ FEED = {
     u'dateModified': VIEW_MAP,
     u'changes': CHANGES_VIEW_MAP,
 }
+LISTING = Listing('Tenders', 'tender', FEED, FIELDS)
 
 
 @opresource(name='Tenders',
@@ -42,11 +40,6 @@ FEED = {
             description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#tender for more info")
 class TendersResource(APIResource):
 
-    def __init__(self, request, context):
-        super(TendersResource, self).__init__(request, context)
-        self.server = request.registry.couchdb_server
-        self.update_after = request.registry.update_after
-
     @json_view(permission='view_tender')
     def get(self):
         """Tenders List
@@ -79,111 +72,79 @@ class TendersResource(APIResource):
             }
 
         """
-        # http://wiki.apache.org/couchdb/HTTP_view_API#Querying_Options
-        params = {}
-        pparams = {}
-        fields = self.request.params.get('opt_fields', '')
-        if fields:
-            params['opt_fields'] = fields
-            pparams['opt_fields'] = fields
-            fields = fields.split(',')
-            view_fields = fields + ['dateModified', 'id']
-        limit = self.request.params.get('limit', '')
-        if limit:
-            params['limit'] = limit
-            pparams['limit'] = limit
-        limit = int(limit) if limit.isdigit() and (100 if fields else 1000) >= int(limit) > 0 else 100
-        descending = bool(self.request.params.get('descending'))
-        offset = self.request.params.get('offset', '')
-        if descending:
-            params['descending'] = 1
-        else:
-            pparams['descending'] = 1
-        feed = self.request.params.get('feed', '')
-        view_map = FEED.get(feed, VIEW_MAP)
-        changes = view_map is CHANGES_VIEW_MAP
-        if feed and feed in FEED:
-            params['feed'] = feed
-            pparams['feed'] = feed
-        mode = self.request.params.get('mode', '')
-        if mode and mode in view_map:
-            params['mode'] = mode
-            pparams['mode'] = mode
-        view_limit = limit + 1 if offset else limit
-        if changes:
-            if offset:
-                view_offset = decrypt(self.server.uuid, self.db.name, offset)
-                if view_offset and view_offset.isdigit():
-                    view_offset = int(view_offset)
-                else:
-                    self.request.errors.add('params', 'offset', 'Offset expired/invalid')
-                    self.request.errors.status = 404
-                    return
-            if not offset:
-                view_offset = 'now' if descending else 0
-        else:
-            if offset:
-                view_offset = offset
-            else:
-                view_offset = '9' if descending else ''
-        list_view = view_map.get(mode, view_map[u''])
-        if self.update_after:
-            view = partial(list_view, self.db, limit=view_limit, startkey=view_offset, descending=descending, stale='update_after')
-        else:
-            view = partial(list_view, self.db, limit=view_limit, startkey=view_offset, descending=descending)
-        if fields:
-            if not changes and set(fields).issubset(set(FIELDS)):
-                results = [
-                    (dict([(i, j) for i, j in x.value.items() + [('id', x.id), ('dateModified', x.key)] if i in view_fields]), x.key)
-                    for x in view()
-                ]
-            elif changes and set(fields).issubset(set(FIELDS)):
-                results = [
-                    (dict([(i, j) for i, j in x.value.items() + [('id', x.id)] if i in view_fields]), x.key)
-                    for x in view()
-                ]
-            elif fields:
-                self.LOGGER.info('Used custom fields for tenders list: {}'.format(','.join(sorted(fields))),
-                            extra=context_unpack(self.request, {'MESSAGE_ID': 'tender_list_custom'}))
+        return LISTING(self)
 
-                results = [
-                    (dict([(k, j) for k, j in i[u'doc'].items() if k in view_fields]), i.key)
-                    for i in view(include_docs=True)
-                ]
-        else:
-            results = [
-                ({'id': i.id, 'dateModified': i.value['dateModified']} if changes else {'id': i.id, 'dateModified': i.key}, i.key)
-                for i in view()
-            ]
-        if results:
-            params['offset'], pparams['offset'] = results[-1][1], results[0][1]
-            if offset and view_offset == results[0][1]:
-                results = results[1:]
-            elif offset and view_offset != results[0][1]:
-                results = results[:limit]
-                params['offset'], pparams['offset'] = results[-1][1], view_offset
-            results = [i[0] for i in results]
-            if changes:
-                params['offset'] = encrypt(self.server.uuid, self.db.name, params['offset'])
-                pparams['offset'] = encrypt(self.server.uuid, self.db.name, pparams['offset'])
-        else:
-            params['offset'] = offset
-            pparams['offset'] = offset
-        data = {
-            'data': results,
-            'next_page': {
-                "offset": params['offset'],
-                "path": self.request.route_path('Tenders', _query=params),
-                "uri": self.request.route_url('Tenders', _query=params)
-            }
-        }
-        if descending or offset:
-            data['prev_page'] = {
-                "offset": pparams['offset'],
-                "path": self.request.route_path('Tenders', _query=pparams),
-                "uri": self.request.route_url('Tenders', _query=pparams)
-            }
-        return data
+
+@opresource(name='Tenders Feed',
+            path='/feed/tenders',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#tender for more info")
+class TendersFeedResource(APIResource):
+
+    @json_view(permission='view_tender')
+    def get(self):
+        """Tenders Feed
+
+        Whole changes feed as newline-delimited JSON for authenticated
+        mirrors, resumable with the last ``checkpoint`` passed as ``since``.
+        """
+        return LISTING.feed(self)
+
+
+@opresource(name='Tenders Bulk Get',
+            path='/bulk_get/tenders',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#tender for more info")
+class TendersBulkGetResource(APIResource):
+
+    @json_view(permission='view_tender')
+    def post(self):
+        """Tenders Bulk Get
+
+        Documents with the ids posted as ``{"data": [id, ...]}``, at most
+        ``bulk_get_limit`` of them; ids not found are listed in ``missing``.
+        """
+        return LISTING.bulk_get(self)
+
+
+@opresource(name='Tenders Search',
+            path='/search/tenders',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#tender for more info")
+class TendersSearchResource(APIResource):
+
+    @json_view(permission='view_tender')
+    def get(self):
+        """Tenders Search
+
+        Tenders with every word of ``q`` in their titles, descriptions, items
+        or procuring entity, best ranked first.
+        """
+        return LISTING.search(self)
+
+
+@opresource(name='Tenders Stats',
+            path='/stats/tenders',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#tender for more info")
+class TendersStatsResource(APIResource):
+
+    @json_view(permission='view_tender')
+    def get(self):
+        """Tenders Stats
+
+        Count and ``value.amount`` sum, min and max of tenders grouped by
+        ``by`` (status, procurementMethodType or month) and, with
+        ``group_level``, by the other dimensions as well.
+        """
+        return LISTING.statistics(self)
+
+
+@opresource(name='Tender Lookup',
+            path='/lookup/tenders/{public_id}',
+            description="Open Contracting compatible data exchange format. See http://ocds.open-contracting.org/standard/r/master/#tender for more info")
+class TenderLookupResource(APIResource):
+
+    @json_view(permission='view_tender')
+    def get(self):
+        """Tender by tenderID"""
+        return {'data': lookup_doc(self.request, 'Tender', self.request.matchdict['public_id'])}
 
 
 @opresource(name='Tender',
@@ -193,9 +154,7 @@ class TenderResource(APIResource):
 
     @json_view(permission='view_tender')
     def get(self):
-        del self.request.validated['tender'].__parent__
-        del self.request.validated['tender'].rev
-        return {'data': self.request.validated['tender']}
+        return document_data(self.request, 'tender')
 
 
 @opresource(name='Tender Items',
@@ -60,6 +60,6 @@ setup(name='openprocurement.edge',
       zip_safe=False,
       install_requires=requires,
       tests_require=test_requires,
-      extras_require={'test': test_requires},
+      extras_require={'test': test_requires, 'memcached': ['python-memcached']},
       test_suite="openprocurement.edge.tests.main.suite",
       entry_points=entry_points)